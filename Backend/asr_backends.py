@@ -0,0 +1,107 @@
+# --- START OF FILE asr_backends.py ---
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+BACKENDS = ("transformers", "int8_dynamic", "faster_whisper")
+MODEL_SIZES = ("tiny", "base", "small", "medium", "large-v3")
+
+
+class FasterWhisperPipeline:
+    """
+    Wraps a faster-whisper (CTranslate2) model so it can stand in for the
+    transformers ASR pipeline: called with one {"raw", "sampling_rate"} dict or a
+    list of them, returns {"text"} dicts. CTranslate2 runs the clips one by one.
+    """
+
+    def __init__(self, size, device="cpu", compute_type="int8", num_threads=0, beam_size=1):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(size, device=device, compute_type=compute_type, cpu_threads=num_threads)
+        self.beam_size = beam_size
+
+    def _one(self, item, generate_kwargs):
+        from transformers.models.whisper.tokenization_whisper import TO_LANGUAGE_CODE
+        language = generate_kwargs.get("language")
+        segments, _ = self.model.transcribe(
+            np.asarray(item["raw"], dtype=np.float32),
+            task=generate_kwargs.get("task", "transcribe"),
+            language=TO_LANGUAGE_CODE.get(language, language),
+            beam_size=self.beam_size,
+        )
+        return {"text": "".join(segment.text for segment in segments).strip()}
+
+    def __call__(self, inputs, batch_size=None, generate_kwargs=None):
+        generate_kwargs = generate_kwargs or {}
+        if isinstance(inputs, list):
+            return [self._one(item, generate_kwargs) for item in inputs]
+        return self._one(inputs, generate_kwargs)
+
+
+def model_id(model_name, size=None):
+    """Hub id for the transformers backends; `size` (e.g. "tiny") overrides the one in `model_name`."""
+    return f"openai/whisper-{size}" if size else model_name
+
+
+def model_size(model_name, size=None):
+    """faster-whisper wants a size name, not an openai/whisper-* repo id."""
+    return size or model_name.rsplit("whisper-", 1)[-1]
+
+
+def build_asr_backend(model_name, backend="transformers", size=None, device="cpu", **options):
+    """
+    Returns a callable with the transformers ASR pipeline's interface.
+
+    "transformers" is the fp32 pipeline. "int8_dynamic" swaps every nn.Linear of
+    the Whisper encoder/decoder for a dynamically quantized int8 one (CPU only;
+    the conv front end stays fp32). "faster_whisper" needs the optional
+    faster-whisper package and runs CTranslate2 int8 kernels.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown ASR backend '{backend}'. Choose one of {BACKENDS}.")
+    if size is not None and size not in MODEL_SIZES:
+        raise ValueError(f"Unknown Whisper size '{size}'. Choose one of {MODEL_SIZES}.")
+    if backend == "faster_whisper":
+        fw_device = "cuda" if str(device).startswith("cuda") else "cpu"
+        compute_type = options.get("compute_type", "int8_float16" if fw_device == "cuda" else "int8")
+        return FasterWhisperPipeline(model_size(model_name, size), fw_device, compute_type,
+                                     num_threads=options.get("num_threads", 0), beam_size=options.get("beam_size", 1))
+
+    from transformers import pipeline
+    asr = pipeline("automatic-speech-recognition", model=model_id(model_name, size), device=device)
+    if backend == "int8_dynamic":
+        if str(device) != "cpu":
+            print(f"WARN: ASR backend '{backend}' is CPU-only; using fp32 on {device}.")
+            return asr
+        asr.model = torch.ao.quantization.quantize_dynamic(asr.model, {nn.Linear}, dtype=torch.qint8)
+    return asr
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance over the reference length (case and punctuation ignored)."""
+    normalize = lambda text: "".join(c.lower() if c.isalnum() or c.isspace() else " " for c in text).split()
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    if not ref:
+        return float(bool(hyp))
+    row = np.arange(len(hyp) + 1)
+    for i, word in enumerate(ref, 1):
+        prev, row = row, np.empty_like(row)
+        row[0] = i
+        for j, other in enumerate(hyp, 1):
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + (word != other))
+    return float(row[-1]) / len(ref)
+
+
+def measure_latency(asr, clip, sample_rate, generate_kwargs, warmup=1, iters=5):
+    inputs = lambda: {"raw": clip, "sampling_rate": sample_rate}  # fresh per call: the pipeline pops its keys
+    for _ in range(warmup):
+        asr(inputs(), generate_kwargs=generate_kwargs)
+    timings = []
+    for _ in range(iters):
+        item = inputs()
+        t0 = time.perf_counter()
+        asr(item, generate_kwargs=generate_kwargs)
+        timings.append((time.perf_counter() - t0) * 1000.0)
+    return {"p50_ms": float(np.percentile(timings, 50)), "p95_ms": float(np.percentile(timings, 95))}
+# --- END OF FILE asr_backends.py ---
@@ -0,0 +1,40 @@
+# --- START OF FILE asr_batcher.py ---
+import asyncio
+
+from .fer_batcher import MicroBatcher
+
+
+class AsrJobTimeout(Exception):
+    """Raised when a transcription job is not finished within its timeout."""
+
+
+class AsrBatcher(MicroBatcher):
+    """
+    Job queue in front of the Whisper pipeline.
+
+    Each job is a list of 16 kHz float32 clips (VAD segments of one upload or one
+    streaming window). Clips from concurrent jobs are queued together and
+    `workers` consumers hand them to the pipeline as one padded batch of up to
+    `max_batch_size`, on the "asr" inference lane. Jobs get a future per clip;
+    the queue is bounded by `max_queue` clips and a job that is not done within
+    its timeout is abandoned (its clips are skipped if not started yet).
+    """
+
+    def __init__(self, model, sample_rate, generate_kwargs, **kwargs):
+        super().__init__(model, device=None, collate_fn=list, **kwargs)
+        self.sample_rate = sample_rate
+        self.generate_kwargs = generate_kwargs
+
+    def _forward(self, clips):
+        inputs = [{"raw": clip, "sampling_rate": self.sample_rate} for clip in clips]  # consumed by the pipeline
+        results = self.model(inputs, batch_size=len(inputs), generate_kwargs=self.generate_kwargs)
+        return [r.get("text", "").strip() for r in results]
+
+    async def transcribe(self, clips, timeout=None):
+        """Queues all clips of one job and returns their texts in order."""
+        futures = self._enqueue(list(clips))
+        try:
+            return await asyncio.wait_for(asyncio.gather(*futures), timeout)
+        except asyncio.TimeoutError:
+            raise AsrJobTimeout(f"Transcription did not finish within {timeout}s.")
+# --- END OF FILE asr_batcher.py ---
@@ -1,13 +1,21 @@
 # --- START OF FILE asr_router.py (UPDATED with JSON APPEND) ---
 import os
-import tempfile
+import asyncio
+import numpy as np
 import torch
-import json # NEW IMPORT
-from datetime import datetime # NEW IMPORT
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from transformers import pipeline
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Form, HTTPException, WebSocket, WebSocketDisconnect
 
-from .models import ASRResponse 
+from .models import ASRResponse, ASRStreamUpdate
+from .inference_executor import get_executor, ExecutorSaturated, RETRY_AFTER_SECONDS
+from .asr_batcher import AsrBatcher, AsrJobTimeout
+from .asr_backends import build_asr_backend, model_id
+from .model_registry import REGISTRY
+from .transcript_store import STORE
+from .topic_analysis import schedule_topic_update
+from .doubt_dedup import collapse_repetition
+from .audio_decode import decode_audio, TARGET_SAMPLE_RATE
+from .vad import detect_speech, VadStats
 
 router = APIRouter(
     prefix="/asr",
@@ -18,98 +26,313 @@ router = APIRouter(
 ASR_MODEL = None
 DEVICE = "cuda:0" if torch.cuda.is_available() else "cpu"
 MODEL_NAME = "openai/whisper-base"
-TRANSCRIPT_FILENAME = "Backend/doubt_transcripts.json" # Use the corrected path
+ASR_REGISTRY_NAME = "whisper_asr"
+GENERATE_KWARGS = {"task": "translate", "language": "english"}
+SAMPLE_RATE = TARGET_SAMPLE_RATE
+STREAM_WINDOW_S = float(os.environ.get("ASR_STREAM_WINDOW_S", 10.0))   # audio per committed window
+STREAM_OVERLAP_S = float(os.environ.get("ASR_STREAM_OVERLAP_S", 1.0))  # re-heard at each window boundary
+STREAM_STEP_S = float(os.environ.get("ASR_STREAM_STEP_S", 1.5))        # new audio between partials
+STREAM_MAX_S = float(os.environ.get("ASR_STREAM_MAX_S", 180.0))
+VAD_ENABLED = os.environ.get("ASR_VAD", "1") == "1"
+MAX_SEGMENT_S = float(os.environ.get("ASR_MAX_SEGMENT_S", 25.0))  # Whisper sees at most 30 s at once
+VAD_STATS = VadStats()
+ASR_BATCH_MAX_SIZE = int(os.environ.get("ASR_BATCH_MAX_SIZE", 8))      # clips per Whisper call
+ASR_BATCH_MAX_WAIT_MS = float(os.environ.get("ASR_BATCH_MAX_WAIT_MS", 50))
+ASR_MAX_QUEUE = int(os.environ.get("ASR_MAX_QUEUE", 64))               # clips waiting, across all jobs
+ASR_JOB_TIMEOUT_S = float(os.environ.get("ASR_JOB_TIMEOUT_S", 60))
+ASR_BATCHER = None
+BACKEND_INFO = {}
 
-def load_asr_model():
-    # ... (Keep load_asr_model function as is)
+def build_asr_pipeline(name, config):
+    """
+    Registry loader for the Whisper pipeline. Config keys: model, size ("tiny" |
+    "base" | "small" ..., overrides the size in `model`), backend ("transformers"
+    | "int8_dynamic" | "faster_whisper"). ASR_BACKEND / ASR_MODEL_SIZE override them.
+    """
+    backend = os.environ.get("ASR_BACKEND", config.get("backend", "transformers"))
+    size = os.environ.get("ASR_MODEL_SIZE", config.get("size"))
+    model_name = config.get("model", MODEL_NAME)
+    print(f"Loading Whisper ASR Pipeline ({model_id(model_name, size)}, backend={backend})...")
+    asr = build_asr_backend(model_name, backend, size=size, device=DEVICE)
+    BACKEND_INFO[name] = {"backend": backend, "model": model_id(model_name, size)}
+    print("Whisper ASR loaded successfully.")
+    return asr
+
+def install_asr_model(name, model):
     global ASR_MODEL
+    ASR_MODEL = model
+    if ASR_BATCHER is not None:
+        ASR_BATCHER.model = model  # hot swap: the next batch uses the new pipeline
+
+REGISTRY.register_loader(
+    "asr", build_asr_pipeline, install_asr_model,
+    defaults={ASR_REGISTRY_NAME: {"model": MODEL_NAME, "backend": "transformers"}},
+    override_keys=("backend", "size"),  # not "model": reloads must not pull arbitrary hub repos
+)
+
+def load_asr_model():
+    """Returns the Whisper pipeline, loading it through the registry if needed."""
     if ASR_MODEL is None:
-        print("Loading Whisper ASR Pipeline...")
-        try:
-            ASR_MODEL = pipeline(
-                "automatic-speech-recognition",
-                model=MODEL_NAME,
-                device=DEVICE
-            )
-            print("Whisper ASR loaded successfully.")
-        except Exception as e:
-            print(f"FAILED to load Whisper ASR: {e}")
+        REGISTRY.get(ASR_REGISTRY_NAME)
     return ASR_MODEL
 
-# --- NEW HELPER FUNCTION TO APPEND TO JSON FILE ---
-def append_transcript_to_json(transcript_text: str):
+# --- Transcript persistence (append-only store) ---
+def append_transcript(transcript_text: str, **scope):
+    """Appends one transcript (tagged with class/lecture/session ids) to the doubt store."""
+    try:
+        doubt_id = STORE.append(transcript_text, **scope)
+        print(f"✅ Transcript #{doubt_id} appended to {STORE.db_path}")
+        return doubt_id
+    except Exception as e:
+        print(f"FATAL ERROR: Could not append transcript to the doubt store: {e}")
+        return None
+
+def find_speech(samples: np.ndarray):
+    """Energy VAD over a 16 kHz clip, or None when ASR_VAD=0 (then the whole clip is used)."""
+    return detect_speech(samples, SAMPLE_RATE) if VAD_ENABLED else None
+
+def get_asr_batcher(asr_pipeline):
+    """The shared ASR job queue (one per worker process), created on first use."""
+    global ASR_BATCHER
+    if ASR_BATCHER is None:
+        executor = get_executor("asr")
+        ASR_BATCHER = AsrBatcher(
+            asr_pipeline, SAMPLE_RATE, GENERATE_KWARGS,
+            max_batch_size=ASR_BATCH_MAX_SIZE,
+            max_wait_ms=ASR_BATCH_MAX_WAIT_MS,
+            max_queue=ASR_MAX_QUEUE,
+            executor=executor,
+            workers=executor.max_workers,
+        )
+    return ASR_BATCHER
+
+async def transcribe_samples(asr_pipeline, samples: np.ndarray, vad=None) -> str:
     """
-    Safely reads the JSON file, appends the new transcript object, and writes back.
-    This function handles the file-locking and parsing required for web backends.
+    Runs Whisper on a 16 kHz float32 clip held in memory. With a VAD result only
+    its speech segments are sent (silence trimmed, long audio split at pauses into
+    <= MAX_SEGMENT_S pieces). Clips go through the ASR job queue, so they share
+    padded batches with other requests' clips.
     """
+    if vad is not None:
+        clips = vad.chunks(samples, MAX_SEGMENT_S)
+    else:
+        clips = [samples] if samples.size else []
+    if not clips:
+        return ""
     try:
-        # 1. Read existing data (or initialize to empty list if file is empty/non-existent)
-        if os.path.exists(TRANSCRIPT_FILENAME) and os.path.getsize(TRANSCRIPT_FILENAME) > 0:
-            with open(TRANSCRIPT_FILENAME, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        else:
-            data = []
-
-        # Ensure data is a list (to prevent crashing if file was corrupted)
-        if not isinstance(data, list):
-            print(f"WARN: {TRANSCRIPT_FILENAME} content was not a list. Resetting file.")
-            data = []
-
-        # 2. Append the new entry
-        new_entry = {
-            "text": transcript_text,
-            "timestamp": datetime.now().isoformat(),
-        }
-        data.append(new_entry)
-
-        # 3. Write back the full list
-        with open(TRANSCRIPT_FILENAME, 'w', encoding='utf-8') as f:
-            # Use indent for readability
-            json.dump(data, f, indent=4, ensure_ascii=False) 
-        
-        print(f"✅ Transcript appended to {TRANSCRIPT_FILENAME}")
-
-    except Exception as e:
-        print(f"FATAL ERROR: Could not append transcript to JSON file: {e}")
-# --- END NEW HELPER FUNCTION ---
+        texts = await get_asr_batcher(asr_pipeline).transcribe(clips, timeout=ASR_JOB_TIMEOUT_S)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+    except AsrJobTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    return " ".join(texts).strip()
 
 
 @router.post("/transcribe", response_model=ASRResponse)
-async def transcribe_audio(file: UploadFile = File(...)):
-    """Transcribes and translates an uploaded audio file (e.g., from browser mic)."""
-    asr_pipeline = load_asr_model()
+async def transcribe_audio(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    class_id: Optional[str] = Form(None),
+    lecture_id: Optional[str] = Form(None),
+    session_id: Optional[str] = Form(None),
+):
+    """
+    Transcribes and translates an uploaded audio file (e.g., from browser mic).
+    The optional ids tag the stored doubt so analysis can be scoped to it later.
+    """
+    asr_pipeline = ASR_MODEL or await asyncio.to_thread(load_asr_model)
     if asr_pipeline is None:
         raise HTTPException(status_code=503, detail="ASR Model not loaded or failed initialization.")
     
-    # Read and save the uploaded file to a temporary location
+    # Decode the upload straight to 16 kHz samples in memory (no temp file)
     try:
         audio_data = await file.read()
-        # Ensure we use a unique temporary filename
-        with tempfile.NamedTemporaryFile(suffix=f".wav", delete=False) as temp_file: 
-            temp_file.write(audio_data)
-            temp_filename = temp_file.name
-        
-        # Use the pipeline to transcribe and translate
-        result = asr_pipeline(
-            temp_filename, 
-            generate_kwargs={"task": "translate", "language": "english"}
-        )
-        
-        transcript = result.get("text", "").strip()
-        os.remove(temp_filename) # Clean up the temporary file
+        try:
+            samples = await asyncio.to_thread(decode_audio, audio_data, SAMPLE_RATE)
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=f"Could not decode audio: {ve}")
+
+        # Trim silence and reject speech-free clips before invoking Whisper
+        vad = find_speech(samples)
+        if vad is not None:
+            VAD_STATS.record(vad)
+            if not vad.has_speech:
+                raise HTTPException(status_code=400, detail="Could not detect speech in the recording.")
+
+        # Use the pipeline to transcribe and translate (off the event loop)
+        # Whisper tends to loop on short clips; store each repeated phrase once
+        transcript = collapse_repetition(await transcribe_samples(asr_pipeline, samples, vad))
         
         if not transcript:
              raise HTTPException(status_code=400, detail="Could not detect speech or failed translation.")
 
-        # --- CRITICAL: Append transcript to file ---
-        append_transcript_to_json(transcript)
-        # ------------------------------------------
+        # --- CRITICAL: Append transcript to the doubt store ---
+        await asyncio.to_thread(append_transcript, transcript, class_id=class_id, lecture_id=lecture_id, session_id=session_id)
+        # -------------------------------------------------------
+        # Fold the new doubt into the live topic clusters after the response is sent (on the "analysis" lane).
+        background_tasks.add_task(schedule_topic_update, lecture_id)
 
-        return ASRResponse(transcript=transcript)
+        return ASRResponse(transcript=transcript, **(vad.summary() if vad is not None else {}))
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"ASR Error: {e}")
-        if 'temp_filename' in locals() and os.path.exists(temp_filename):
-            os.remove(temp_filename)
         raise HTTPException(status_code=500, detail=f"Transcription failed: {e}")
+
+
+# --- Streaming transcription ---
+def merge_overlap(previous: str, new: str, max_words: int = 12, min_words: int = 2) -> str:
+    """Appends `new` to `previous`, dropping the words both windows heard in their overlap.
+    A single shared word is kept: it is as likely a real repeat ("so" + "so what") as overlap."""
+    prev_words, new_words = previous.split(), new.split()
+    norm = lambda ws: [w.lower().strip(".,!?;:") for w in ws]
+    p, n = norm(prev_words[-max_words:]), norm(new_words[:max_words])
+    for k in range(min(len(p), len(n)), min_words - 1, -1):
+        if p[-k:] == n[:k]:
+            new_words = new_words[k:]
+            break
+    return " ".join(prev_words + new_words)
+
+@router.websocket("/stream")
+async def transcribe_stream(
+    websocket: WebSocket,
+    class_id: Optional[str] = None,
+    lecture_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+):
+    """
+    Streaming transcription. The client sends binary 16 kHz mono PCM16 chunks
+    and the text message "end" when the student stops talking.
+
+    Audio is cut into STREAM_WINDOW_S windows that overlap by STREAM_OVERLAP_S;
+    each full window is transcribed once and committed, and the words repeated in
+    the overlap are merged away; silent windows never reach Whisper. Every STREAM_STEP_S of new audio the open window
+    is transcribed too and sent as a partial. On "end" the rest is transcribed,
+    sent as the final transcript and only that is persisted.
+    """
+    asr_pipeline = ASR_MODEL or await asyncio.to_thread(load_asr_model)
+    if asr_pipeline is None:
+        await websocket.close(code=1011, reason="ASR Model not loaded or failed initialization.")
+        return
+    await websocket.accept()
+
+    window = int(STREAM_WINDOW_S * SAMPLE_RATE)
+    hop = window - int(STREAM_OVERLAP_S * SAMPLE_RATE)
+    step = int(STREAM_STEP_S * SAMPLE_RATE)
+    max_samples = int(STREAM_MAX_S * SAMPLE_RATE)
+    state = {"chunks": [], "samples": 0, "ended": False, "closed": False}
+    audio_ready = asyncio.Event()
+
+    async def receive_audio():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("text") is not None:
+                    if message["text"].strip().lower() == "end":
+                        state["ended"] = True
+                        break
+                    continue  # keep-alives
+                data = message.get("bytes") or b""
+                if len(data) % 2:
+                    data = data[:-1]
+                pcm = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+                state["chunks"].append(pcm)
+                state["samples"] += pcm.size
+                audio_ready.set()
+                if state["samples"] >= max_samples:
+                    state["ended"] = True  # cap reached: finalize what we have
+                    break
+        finally:
+            state["closed"] = True
+            audio_ready.set()
+
+    receiver = asyncio.create_task(receive_audio())
+    buffer = np.zeros(0, dtype=np.float32)
+    committed, start, last_partial = "", 0, 0
+    try:
+        while True:
+            await audio_ready.wait()
+            audio_ready.clear()
+            if state["chunks"]:
+                buffer = np.concatenate([buffer] + state["chunks"])
+                state["chunks"] = []
+            if state["closed"]:
+                break
+
+            try:
+                # Commit every full window, then refresh the partial for the open one.
+                while buffer.size - start >= window:
+                    clip = buffer[start:start + window]
+                    text = await transcribe_samples(asr_pipeline, clip, find_speech(clip))
+                    committed = merge_overlap(committed, text)
+                    start += hop
+                if buffer.size - last_partial >= step:
+                    last_partial = buffer.size
+                    clip = buffer[start:]
+                    tentative = await transcribe_samples(asr_pipeline, clip, find_speech(clip))
+                    await websocket.send_json(ASRStreamUpdate(
+                        type="partial",
+                        transcript=merge_overlap(committed, tentative),
+                        audio_seconds=round(buffer.size / SAMPLE_RATE, 2),
+                    ).dict())
+            except HTTPException as e:
+                # Queue full or job timed out: skip this partial, the next one covers the same audio.
+                await websocket.send_json({"type": "error", "error": e.detail, "retry_after": RETRY_AFTER_SECONDS})
+
+        if not state["ended"]:
+            return  # client went away without "end": nothing is stored
+
+        while buffer.size - start > window:
+            clip = buffer[start:start + window]
+            committed = merge_overlap(committed, await transcribe_samples(asr_pipeline, clip, find_speech(clip)))
+            start += hop
+        clip = buffer[start:]
+        tail = await transcribe_samples(asr_pipeline, clip, find_speech(clip)) if clip.size else ""
+        transcript = collapse_repetition(merge_overlap(committed, tail))
+        if not transcript:
+            await websocket.send_json({"type": "error", "error": "Could not detect speech or failed translation."})
+            await websocket.close()
+            return
+        doubt_id = await asyncio.to_thread(
+            append_transcript, transcript, class_id=class_id, lecture_id=lecture_id, session_id=session_id,
+        )
+        await websocket.send_json(ASRStreamUpdate(
+            type="final",
+            transcript=transcript,
+            audio_seconds=round(buffer.size / SAMPLE_RATE, 2),
+            doubt_id=doubt_id,
+        ).dict())
+        await websocket.close()
+        await schedule_topic_update(lecture_id)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"ASR stream error ({session_id}): {e}")
+        try:
+            await websocket.send_json({"type": "error", "error": f"Transcription failed: {e}"})
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+    finally:
+        receiver.cancel()
+
+async def close_asr_batcher():
+    """Stops the ASR queue workers on shutdown."""
+    if ASR_BATCHER is not None:
+        await ASR_BATCHER.close()
+
+def asr_stats():
+    return {
+        "vad_enabled": VAD_ENABLED,
+        "backend": BACKEND_INFO.get(ASR_REGISTRY_NAME, {}),
+        "vad": VAD_STATS.stats(),
+        "queue": {
+            "pending_clips": ASR_BATCHER.pending() if ASR_BATCHER else 0,
+            "max_queue": ASR_MAX_QUEUE,
+            **(ASR_BATCHER.stats.snapshot() if ASR_BATCHER else {}),
+        },
+    }
 # --- END OF FILE asr_router.py (UPDATED) ---
\ No newline at end of file
@@ -0,0 +1,89 @@
+# --- START OF FILE audio_decode.py ---
+import io
+import subprocess
+import wave
+from math import gcd
+
+import numpy as np
+
+try:
+    from scipy.signal import resample_poly
+except ImportError:  # fall back to linear interpolation
+    resample_poly = None
+
+TARGET_SAMPLE_RATE = 16000  # what Whisper expects
+FFMPEG_BIN = "ffmpeg"
+
+
+def resample(samples, orig_sr, target_sr=TARGET_SAMPLE_RATE):
+    """Vectorized resampling (polyphase FIR with scipy, else linear interpolation)."""
+    if orig_sr == target_sr or samples.size == 0:
+        return samples.astype(np.float32, copy=False)
+    if resample_poly is not None:
+        g = gcd(int(orig_sr), int(target_sr))
+        return resample_poly(samples, target_sr // g, orig_sr // g).astype(np.float32)
+    n_out = int(round(samples.size * target_sr / orig_sr))
+    positions = np.arange(n_out, dtype=np.float64) * (orig_sr / target_sr)
+    return np.interp(positions, np.arange(samples.size), samples).astype(np.float32)
+
+
+def _pcm_to_float(frames, sample_width, channels):
+    if sample_width == 1:  # unsigned 8-bit
+        audio = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        audio = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif sample_width == 3:  # 24-bit: widen to int32 by shifting into the top bytes
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        wide = np.zeros((raw.shape[0], 4), dtype=np.uint8)
+        wide[:, 1:] = raw
+        audio = wide.view("<i4").reshape(-1).astype(np.float32) / 2147483648.0
+    elif sample_width == 4:
+        audio = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {sample_width} bytes")
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio
+
+
+def decode_wav(data, target_sr=TARGET_SAMPLE_RATE):
+    """PCM WAV bytes -> mono float32 at `target_sr`, without touching disk."""
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        channels, width, sr = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    return resample(_pcm_to_float(frames, width, channels), sr, target_sr)
+
+
+def decode_ffmpeg(data, target_sr=TARGET_SAMPLE_RATE):
+    """Any container ffmpeg understands (webm/opus from MediaRecorder, mp3, ogg...) via stdin/stdout pipes."""
+    cmd = [FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+           "-ac", "1", "-ar", str(target_sr), "-f", "f32le", "pipe:1"]
+    try:
+        proc = subprocess.run(cmd, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    except FileNotFoundError:
+        raise ValueError("ffmpeg is required to decode non-WAV audio but was not found on PATH.")
+    if proc.returncode != 0:
+        raise ValueError(f"ffmpeg could not decode the audio: {proc.stderr.decode(errors='ignore').strip()[:200]}")
+    return np.frombuffer(proc.stdout, dtype="<f4").copy()
+
+
+def is_wav(data):
+    return len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+def decode_audio(data, target_sr=TARGET_SAMPLE_RATE):
+    """
+    Uploaded audio bytes -> mono float32 samples at `target_sr`, all in memory.
+    PCM WAV is parsed with the `wave` module; everything else (and WAV encodings
+    `wave` does not handle, such as float) goes through an ffmpeg pipe.
+    Raises ValueError for empty or undecodable input.
+    """
+    if not data:
+        raise ValueError("Empty audio upload.")
+    if is_wav(data):
+        try:
+            return decode_wav(data, target_sr)
+        except (wave.Error, EOFError, ValueError):
+            pass
+    return decode_ffmpeg(data, target_sr)
+# --- END OF FILE audio_decode.py ---
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# bench_asr_backends.py
+# Word error rate + latency of the ASR backends (fp32 transformers, int8
+# dynamic quantization, faster-whisper) across Whisper sizes on CPU.
+#
+# --audio_dir holds local recordings (wav, or anything ffmpeg decodes), each with
+# a reference transcript next to it (doubt1.wav + doubt1.txt, in English since
+# the router translates). Without it only latency on a synthetic clip is reported.
+#
+#   python -m Backend.benchmarks.bench_asr_backends --audio_dir path/to/sample_doubts
+#   python -m Backend.benchmarks.bench_asr_backends --sizes tiny,base,small --backends transformers,int8_dynamic
+
+import argparse, glob, io, os, time
+
+import numpy as np
+import torch
+
+from Backend.asr_router import GENERATE_KWARGS, MODEL_NAME, SAMPLE_RATE
+from Backend.asr_backends import BACKENDS, build_asr_backend, word_error_rate, measure_latency
+from Backend.audio_decode import decode_audio
+
+def load_samples(audio_dir):
+    samples = []
+    for ref_path in sorted(glob.glob(os.path.join(audio_dir, "*.txt"))):
+        base = os.path.splitext(ref_path)[0]
+        audio = [p for p in glob.glob(base + ".*") if not p.endswith(".txt")]
+        if not audio:
+            continue
+        with open(audio[0], "rb") as f:
+            clip = decode_audio(f.read(), SAMPLE_RATE)
+        with open(ref_path, "r", encoding="utf-8") as f:
+            samples.append((os.path.basename(audio[0]), clip, f.read().strip()))
+    return samples
+
+def state_mb(asr):
+    # Serialized weights: quantized Linear layers keep theirs in packed params, not parameters().
+    if not hasattr(asr, "model") or not isinstance(asr.model, torch.nn.Module):
+        return None
+    buf = io.BytesIO()
+    torch.save(asr.model.state_dict(), buf)
+    return round(buf.tell() / 2**20, 1)
+
+def synthetic_clip(seconds):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
+    return (0.1 * envelope * np.random.default_rng(0).standard_normal(t.size)).astype(np.float32)
+
+def main():
+    ap = argparse.ArgumentParser("ASR backend benchmark")
+    ap.add_argument("--model", default=MODEL_NAME)
+    ap.add_argument("--sizes", default="tiny,base,small")
+    ap.add_argument("--backends", default=",".join(BACKENDS))
+    ap.add_argument("--audio_dir", default=None, help="Folder of recordings with reference .txt transcripts")
+    ap.add_argument("--seconds", type=float, default=8.0, help="synthetic clip length when no audio_dir")
+    ap.add_argument("--iters", type=int, default=5)
+    ap.add_argument("--threads", type=int, default=0)
+    args = ap.parse_args()
+
+    if args.threads: torch.set_num_threads(args.threads)
+    samples = load_samples(args.audio_dir) if args.audio_dir else []
+    latency_clip = samples[0][1] if samples else synthetic_clip(args.seconds)
+    audio_s = sum(clip.size for _, clip, _ in samples) / SAMPLE_RATE
+    print(f"{len(samples)} reference clips ({audio_s:.1f}s); latency clip {latency_clip.size / SAMPLE_RATE:.1f}s")
+    print(f"{'size':>9}  {'backend':>15}  {'load s':>7}  {'model MB':>9}  {'p50 ms':>8}  {'p95 ms':>8}  {'RTF':>6}  {'WER':>6}")
+
+    for size in args.sizes.split(","):
+        for backend in args.backends.split(","):
+            try:
+                t0 = time.perf_counter()
+                asr = build_asr_backend(args.model, backend, size=size, device="cpu")
+                load_s = time.perf_counter() - t0
+            except Exception as e:  # e.g. faster-whisper not installed
+                print(f"{size:>9}  {backend:>15}  skipped: {e}")
+                continue
+            lat = measure_latency(asr, latency_clip, SAMPLE_RATE, GENERATE_KWARGS, iters=args.iters)
+            rtf = lat["p50_ms"] / 1000.0 / (latency_clip.size / SAMPLE_RATE)
+            wer = "n/a"
+            if samples:
+                errors = [word_error_rate(ref, asr({"raw": clip, "sampling_rate": SAMPLE_RATE},
+                                                   generate_kwargs=GENERATE_KWARGS)["text"])
+                          for _, clip, ref in samples]
+                wer = f"{np.mean(errors):.3f}"
+            mb = state_mb(asr)
+            print(f"{size:>9}  {backend:>15}  {load_s:>7.1f}  {mb if mb is not None else '-':>9}  "
+                  f"{lat['p50_ms']:>8.0f}  {lat['p95_ms']:>8.0f}  {rtf:>6.2f}  {wer:>6}")
+
+if __name__ == "__main__":
+    main()
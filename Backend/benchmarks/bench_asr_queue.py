@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# bench_asr_queue.py
+# Whisper throughput under concurrent uploads: one pipeline call per clip
+# (max batch size 1) vs the ASR job queue coalescing clips into padded batches.
+# Reports clips/second and per-job latency for each concurrency level.
+#
+#   python -m Backend.benchmarks.bench_asr_queue --concurrency 10 50
+#   python -m Backend.benchmarks.bench_asr_queue --audio doubt.wav --batch-sizes 1 4 8 16
+#   python -m Backend.benchmarks.bench_asr_queue --model openai/whisper-tiny --workers 2
+
+import argparse, asyncio, statistics, time
+
+import numpy as np
+
+from Backend.asr_router import build_asr_pipeline, GENERATE_KWARGS, MODEL_NAME, SAMPLE_RATE
+from Backend.asr_batcher import AsrBatcher
+from Backend.audio_decode import decode_audio
+from Backend.inference_executor import InferenceExecutor
+
+def synthetic_clip(seconds):
+    # Speech-like noise: Whisper's cost depends on clip length, not content.
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
+    noise = np.random.default_rng(0).standard_normal(t.size)
+    return (0.1 * envelope * noise).astype(np.float32)
+
+async def run(model, clip, concurrency, jobs, batch_size, workers, wait_ms):
+    executor = InferenceExecutor("asr-bench", workers, max_pending=jobs)
+    batcher = AsrBatcher(model, SAMPLE_RATE, GENERATE_KWARGS, max_batch_size=batch_size,
+                         max_wait_ms=wait_ms, max_queue=jobs, executor=executor, workers=workers)
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with gate:
+            t0 = time.perf_counter()
+            await batcher.transcribe([clip])
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(jobs)))
+    wall = time.perf_counter() - t0
+    stats = batcher.stats.snapshot()
+    await batcher.close()
+    executor.shutdown()
+    latencies.sort()
+    return jobs / wall, statistics.median(latencies), latencies[int(0.95 * (len(latencies) - 1))], stats["mean_batch_size"]
+
+def main():
+    ap = argparse.ArgumentParser("ASR job queue benchmark")
+    ap.add_argument("--model", default=MODEL_NAME)
+    ap.add_argument("--audio", default=None, help="clip to transcribe (default: synthetic)")
+    ap.add_argument("--seconds", type=float, default=5.0, help="length of the synthetic clip")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[10, 50])
+    ap.add_argument("--jobs", type=int, default=None, help="uploads per run (default: 2x concurrency)")
+    ap.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8])
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--wait-ms", type=float, default=50.0)
+    args = ap.parse_args()
+
+    if args.audio:
+        with open(args.audio, "rb") as f:
+            clip = decode_audio(f.read(), SAMPLE_RATE)
+    else:
+        clip = synthetic_clip(args.seconds)
+    model = build_asr_pipeline("bench", {"model": args.model})
+    asyncio.run(run(model, clip[:SAMPLE_RATE], 1, 2, 1, 1, 0.0))  # warm-up
+
+    print(f"model: {args.model}; clip: {clip.size / SAMPLE_RATE:.1f}s; workers: {args.workers}")
+    print(f"{'conc':>5}  {'batch':>5}  {'clips/s':>8}  {'p50 ms':>9}  {'p95 ms':>9}  {'mean batch':>10}")
+    for c in args.concurrency:
+        jobs = args.jobs or 2 * c
+        for b in args.batch_sizes:
+            cps, p50, p95, mean_batch = asyncio.run(run(model, clip, c, jobs, b, args.workers, args.wait_ms))
+            print(f"{c:>5}  {b:>5}  {cps:>8.2f}  {p50:>9.1f}  {p95:>9.1f}  {mean_batch:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# bench_audio_decode.py
+# Per-request cost of getting an upload to 16 kHz float32 samples: the old
+# temp-file round-trip (write upload, read it back, decode, delete) vs decoding
+# the bytes in memory, under concurrent uploads. Whisper itself is not run.
+#
+#   python -m Backend.benchmarks.bench_audio_decode --concurrency 1 10 50 --seconds 8
+#   python -m Backend.benchmarks.bench_audio_decode --tmpdir /var/tmp   # disk instead of tmpfs
+
+import argparse, io, os, statistics, tempfile, time, wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from Backend.audio_decode import decode_audio
+
+def make_wav(seconds, sr, channels):
+    t = np.arange(int(seconds * sr)) / sr
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * np.random.default_rng(0).standard_normal(t.size)
+    pcm = (np.repeat(tone[:, None], channels, axis=1) * 32767).astype("<i2")
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+def via_tempfile(data, tmpdir):
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False, dir=tmpdir) as f:
+        f.write(data)
+        name = f.name
+    try:
+        with open(name, "rb") as f:
+            return decode_audio(f.read())
+    finally:
+        os.remove(name)
+
+def in_memory(data, tmpdir):
+    return decode_audio(data)
+
+def run(fn, data, concurrency, requests, tmpdir):
+    def one(_):
+        t0 = time.perf_counter()
+        fn(data, tmpdir)
+        return (time.perf_counter() - t0) * 1000.0
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        lat = sorted(pool.map(one, range(requests)))
+    wall = time.perf_counter() - t0
+    return statistics.median(lat), lat[int(0.95 * (len(lat) - 1))], requests / wall
+
+def main():
+    ap = argparse.ArgumentParser("In-memory audio decode benchmark")
+    ap.add_argument("--seconds", type=float, default=8.0)
+    ap.add_argument("--sample-rate", type=int, default=44100)
+    ap.add_argument("--channels", type=int, default=2)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--tmpdir", default=None, help="where the temp-file path writes (default: system temp)")
+    args = ap.parse_args()
+
+    data = make_wav(args.seconds, args.sample_rate, args.channels)
+    print(f"clip: {args.seconds}s, {args.sample_rate} Hz, {args.channels} ch, {len(data) / 1024:.0f} KiB; "
+          f"temp dir: {args.tmpdir or tempfile.gettempdir()}")
+    print(f"{'conc':>5}  {'path':>9}  {'p50 ms':>8}  {'p95 ms':>8}  {'req/s':>8}  {'disk MiB written':>16}")
+    for c in args.concurrency:
+        for name, fn in (("tempfile", via_tempfile), ("memory", in_memory)):
+            p50, p95, rps = run(fn, data, c, args.requests, args.tmpdir)
+            written = len(data) * args.requests / 2**20 if fn is via_tempfile else 0.0
+            print(f"{c:>5}  {name:>9}  {p50:>8.2f}  {p95:>8.2f}  {rps:>8.1f}  {written:>16.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# bench_cold_start.py
+# Cold-start time of the whole app: imports + loading every registry model,
+# sequential (the old lifespan behaviour) vs concurrent. Each run is a fresh
+# interpreter so nothing is cached in-process.
+#
+#   python Backend/benchmarks/bench_cold_start.py --runs 3
+
+import argparse, json, os, subprocess, sys, statistics
+
+CHILD = r"""
+import json, os, time
+t0 = time.perf_counter()
+from Backend.main import app
+from Backend.fer_router import load_fer_stages
+from Backend.model_registry import REGISTRY
+t_import = time.perf_counter() - t0
+load_fer_stages()
+REGISTRY.load_all(concurrent=os.environ["MODEL_LOAD_CONCURRENT"] == "1")
+info = REGISTRY.info()
+print("@@" + json.dumps({
+    "import_s": t_import,
+    "total_s": time.perf_counter() - t0,
+    "rss_mb": info["rss_mb"],
+    "models": {m["name"]: [m["status"], m["load_time_s"], m["param_mb"]] for m in info["models"]},
+}))
+"""
+
+def run_once(concurrent):
+    env = {**os.environ, "MODEL_LOAD_CONCURRENT": "1" if concurrent else "0"}
+    out = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(next(l for l in out.splitlines() if l.startswith("@@"))[2:])
+
+def main():
+    ap = argparse.ArgumentParser("Cold-start benchmark (run from the repo root)")
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    for concurrent in (False, True):
+        results = [run_once(concurrent) for _ in range(args.runs)]
+        totals = [r["total_s"] for r in results]
+        label = "concurrent" if concurrent else "sequential"
+        print(f"{label:11s} total {statistics.median(totals):6.2f}s (min {min(totals):.2f})  "
+              f"imports {statistics.median(r['import_s'] for r in results):.2f}s  rss {results[-1]['rss_mb']:.0f} MB")
+        for name, (status, load_s, mb) in results[-1]["models"].items():
+            print(f"    {name:16s} {status:8s} {load_s}s  {mb} MB params")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# bench_dedup.py
+# Encode cost of the doubt file with and without the dedup stage (repetition
+# collapsing + MinHash/Jaccard near-duplicate merging with a filler-word check). Uses the real sentence model,
+# uncached, so the difference is what the analysis endpoints save.
+#
+#   python -m Backend.benchmarks.bench_dedup --file Backend/doubt_transcripts.json --repeat 50
+
+import argparse, json, time
+
+from Backend.doubt_dedup import prepare_doubts
+from Backend.embedding_service import build_embedder, DEFAULT_MODEL_NAME
+
+def load_texts(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [d.get("text", "") if isinstance(d, dict) else d for d in data if d]
+
+def encode_ms(model, texts):
+    t0 = time.perf_counter()
+    model.encode(texts, batch_size=64, show_progress_bar=False)
+    return (time.perf_counter() - t0) * 1000.0
+
+def main():
+    ap = argparse.ArgumentParser("Dedup encode-time benchmark")
+    ap.add_argument("--file", default="Backend/doubt_transcripts.json")
+    ap.add_argument("--repeat", type=int, default=20, help="replicate the file to mimic a longer history")
+    ap.add_argument("--model", default=DEFAULT_MODEL_NAME)
+    args = ap.parse_args()
+
+    raw = load_texts(args.file) * args.repeat
+    t0 = time.perf_counter()
+    texts, weights = prepare_doubts(raw)
+    dedup_ms = (time.perf_counter() - t0) * 1000.0
+
+    model = build_embedder("bench", {"model": args.model, "device": "cpu", "warmup": True})
+    raw_ms = encode_ms(model, raw)
+    dedup_encode_ms = encode_ms(model, texts)
+
+    words = lambda ts: sum(len(t.split()) for t in ts)
+    print(f"doubts     : {len(raw)} raw -> {len(texts)} after dedup (weights sum {sum(weights)})")
+    print(f"words      : {words(raw)} raw -> {words(texts)} after dedup")
+    print(f"encode ms  : {raw_ms:.1f} raw vs {dedup_encode_ms:.1f} + {dedup_ms:.1f} dedup "
+          f"({raw_ms / max(dedup_encode_ms + dedup_ms, 1e-9):.1f}x)")
+
+if __name__ == "__main__":
+    main()
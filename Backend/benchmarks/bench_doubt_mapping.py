@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# bench_doubt_mapping.py
+# Doubt -> chunk mapping cost: the old dense cosine_similarity matrix + Python
+# loop vs the blocked NumPy top-k / bincount engine vs the faiss HNSW index
+# (if installed). Embeddings are synthetic (doubts = noisy copies of chunks),
+# so only the mapping is timed, not the encoder.
+#
+#   python -m Backend.benchmarks.bench_doubt_mapping --doubts 10000 100000 --chunks 20 1000 5000
+#   python -m Backend.benchmarks.bench_doubt_mapping --top-k 3
+
+import argparse, time
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from Backend.doubt_mapping import aggregate, block_rows_for, top_k_ann, top_k_exact, normalize
+
+def synthetic(n_doubts, n_chunks, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    chunks = rng.standard_normal((n_chunks, dim)).astype(np.float32)
+    owner = rng.integers(0, n_chunks, n_doubts)
+    doubts = chunks[owner] + 1.5 * rng.standard_normal((n_doubts, dim)).astype(np.float32)
+    return doubts, chunks
+
+def legacy(doubts, chunks, weights):
+    similarity_matrix = cosine_similarity(doubts, chunks)
+    num_doubts, total_similarity = np.zeros(len(chunks)), np.zeros(len(chunks))
+    for i, weight in enumerate(weights):
+        best_idx = similarity_matrix[i].argmax()
+        num_doubts[best_idx] += weight
+        total_similarity[best_idx] += weight * similarity_matrix[i][best_idx]
+    return num_doubts, similarity_matrix.nbytes
+
+def main():
+    ap = argparse.ArgumentParser("Doubt-to-chunk mapping benchmark")
+    ap.add_argument("--doubts", type=int, nargs="+", default=[10000, 100000])
+    ap.add_argument("--chunks", type=int, nargs="+", default=[20, 1000, 5000])
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--top-k", type=int, default=1)
+    ap.add_argument("--legacy-max-pairs", type=int, default=200_000_000, help="skip the dense path above this")
+    args = ap.parse_args()
+
+    try:
+        import faiss  # noqa: F401
+        have_faiss = True
+    except ImportError:
+        have_faiss = False
+    print(f"{'doubts':>7}  {'chunks':>6}  {'method':>7}  {'seconds':>8}  {'matrix MB':>9}  {'top-1 agree':>11}")
+    for n_doubts in args.doubts:
+        for n_chunks in args.chunks:
+            doubts, chunks = synthetic(n_doubts, n_chunks, args.dim)
+            weights = np.ones(n_doubts)
+            t0 = time.perf_counter()
+            d, c = normalize(doubts), normalize(chunks)
+            idx, sims = top_k_exact(d, c, args.top_k)
+            exact_counts, _ = aggregate(idx, sims, weights, n_chunks)
+            exact_s = time.perf_counter() - t0
+            exact_top1 = idx[np.arange(n_doubts), sims.argmax(axis=1)]
+            block_mb = min(n_doubts, block_rows_for(n_chunks)) * n_chunks * 4 / 2**20
+
+            if n_doubts * n_chunks <= args.legacy_max_pairs:
+                t0 = time.perf_counter()
+                legacy_counts, nbytes = legacy(doubts, chunks, weights)
+                legacy_s = time.perf_counter() - t0
+                same = np.array_equal(legacy_counts, exact_counts) if args.top_k == 1 else "-"
+                print(f"{n_doubts:>7}  {n_chunks:>6}  {'legacy':>7}  {legacy_s:>8.3f}  {nbytes / 2**20:>9.1f}  {str(same):>11}")
+            print(f"{n_doubts:>7}  {n_chunks:>6}  {'exact':>7}  {exact_s:>8.3f}  {block_mb:>9.1f}  {'1.000':>11}")
+
+            if have_faiss and n_chunks >= 100:
+                t0 = time.perf_counter()
+                d, c = normalize(doubts), normalize(chunks)
+                idx, sims = top_k_ann(d, c, args.top_k)
+                aggregate(idx, sims, weights, n_chunks)
+                ann_s = time.perf_counter() - t0
+                agree = float(np.mean(idx[np.arange(n_doubts), sims.argmax(axis=1)] == exact_top1))
+                print(f"{n_doubts:>7}  {n_chunks:>6}  {'ann':>7}  {ann_s:>8.3f}  {'-':>9}  {agree:>11.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# bench_doubt_store.py
+# Reading one lecture's doubts from the transcript store as the total history
+# grows. With the (lecture_id, created_at) index the per-lecture read should
+# stay flat; the unfiltered read is shown for comparison.
+#
+#   python -m Backend.benchmarks.bench_doubt_store --sizes 10000 100000 300000
+
+import argparse, os, random, statistics, tempfile, time
+
+from Backend.transcript_store import TranscriptStore
+
+WORDS = "gradient descent matrix vector chain rule loss function overfitting bias variance kernel".split()
+
+def fill(store, start, stop, per_lecture, per_lecture_s=3600.0):
+    conn = store._connect()
+    rows = []
+    for i in range(start, stop):
+        lecture = i // per_lecture
+        created = 1.7e9 + lecture * per_lecture_s + random.random() * per_lecture_s
+        text = " ".join(random.choices(WORDS, k=8))
+        rows.append((text, "", created, f"class-{lecture % 10}", f"lecture-{lecture}", f"s-{i % 5000}"))
+    conn.execute("BEGIN")
+    conn.executemany("INSERT INTO doubts (text, timestamp, created_at, class_id, lecture_id, session_id) VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.execute("COMMIT")
+
+def timed(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        n = fn()
+        times.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(times), n
+
+def main():
+    ap = argparse.ArgumentParser("Doubt store scoped-read benchmark")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+    ap.add_argument("--per-lecture", type=int, default=200, help="doubts recorded per lecture")
+    ap.add_argument("--repeats", type=int, default=5)
+    args = ap.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    store = TranscriptStore(path, legacy_json=None)
+    have = 0
+    print(f"{'doubts':>8}  {'lecture read ms':>15}  {'rows':>5}  {'1h window ms':>12}  {'full scan ms':>12}")
+    for size in sorted(args.sizes):
+        fill(store, have, size, args.per_lecture)
+        have = size
+        middle = size // args.per_lecture // 2
+        lecture = f"lecture-{middle}"
+        window_start = 1.7e9 + middle * 3600.0
+        lec_ms, lec_n = timed(lambda: sum(1 for _ in store.iter_texts(lecture_id=lecture)), args.repeats)
+        win_ms, _ = timed(lambda: sum(1 for _ in store.iter_texts(since=window_start, until=window_start + 3600)), args.repeats)
+        all_ms, _ = timed(lambda: sum(1 for _ in store.iter_texts()), max(1, args.repeats // 2))
+        print(f"{size:>8}  {lec_ms:>15.2f}  {lec_n:>5}  {win_ms:>12.2f}  {all_ms:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# bench_fer_backends.py
+# Latency + accuracy-parity comparison of the FER inference backends on CPU.
+#
+#   python -m Backend.benchmarks.bench_fer_backends --weights Backend/fer13_mnetv2_binary.pt \
+#       --calibration_dir path/to/sample_faces
+
+import argparse
+import torch
+
+from Backend.fer_router import TinyImgClassifier, load_calibration_batches
+from Backend.fer_backends import BACKENDS, build_backend, check_parity, measure_latency
+
+def main():
+    ap = argparse.ArgumentParser("FER backend benchmark")
+    ap.add_argument("--weights", default="Backend/fer13_mnetv2_binary.pt")
+    ap.add_argument("--calibration_dir", default=None, help="Folder of face JPEGs (calibration + parity)")
+    ap.add_argument("--backends", default=",".join(BACKENDS))
+    ap.add_argument("--batch_sizes", default="1,8,32")
+    ap.add_argument("--iters", type=int, default=20)
+    ap.add_argument("--threads", type=int, default=0)
+    args = ap.parse_args()
+
+    if args.threads: torch.set_num_threads(args.threads)
+    model = TinyImgClassifier(num_classes=2, pretrained=False)
+    model.load_state_dict(torch.load(args.weights, map_location="cpu", weights_only=True))
+    model.eval()
+
+    calibration = load_calibration_batches(args.calibration_dir)
+    parity_inputs = torch.cat(calibration) if calibration else torch.randn(32, 3, 224, 224)
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+
+    print(f"{'backend':14s} {'agree':>6s} {'max|dp|':>8s} " + " ".join(f"{'b'+str(b)+' p50':>9s}" for b in batch_sizes))
+    for name in args.backends.split(","):
+        try:
+            fn = build_backend(model, name, "cpu", weights_path=args.weights, calibration_batches=calibration)
+            parity = check_parity(model, fn, parity_inputs)
+            lat = [measure_latency(fn, torch.randn(b, 3, 224, 224), iters=args.iters)["p50_ms"] for b in batch_sizes]
+        except Exception as e:
+            print(f"{name:14s} failed: {e}")
+            continue
+        print(f"{name:14s} {parity['label_agreement']:6.3f} {parity['max_abs_prob_diff']:8.4f} "
+              + " ".join(f"{ms:9.2f}" for ms in lat))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# bench_keywords.py
+# YAKE keyword extraction over lecture chunks: serial vs the keyword process
+# pool, on long synthetic transcripts built by cycling the lines of
+# Backend/sample_lecture.txt with fresh timestamps. Results must match serial.
+#
+#   python -m Backend.benchmarks.bench_keywords --minutes 30 90 180 --workers 2 4
+#   python -m Backend.benchmarks.bench_keywords --lines-per-minute 20
+
+import argparse, re, time
+
+from Backend.lecture_analysis_router import parse_transcript_lines, determine_chunk_size, chunk_transcript
+from Backend.keyword_extraction import extract_keywords_batch, get_keyword_pool, shutdown_keyword_pool
+
+def synthetic_transcript(minutes, lines_per_minute, source="Backend/sample_lecture.txt"):
+    with open(source, "r", encoding="utf-8") as f:
+        lines = [re.sub(r"^\[[\d:]+\]\s*", "", l.strip()) for l in f if l.strip()]
+    step = 60.0 / lines_per_minute
+    out = []
+    for i in range(int(minutes * lines_per_minute)):
+        t = int(i * step)
+        out.append(f"[{t // 3600:02d}:{t // 60 % 60:02d}:{t % 60:02d}] {lines[i % len(lines)]}")
+    return "\n".join(out)
+
+def timed(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+def main():
+    ap = argparse.ArgumentParser("Parallel keyword extraction benchmark")
+    ap.add_argument("--minutes", type=int, nargs="+", default=[30, 90, 180])
+    ap.add_argument("--lines-per-minute", type=float, default=12.0, help="transcript density (~150 wpm speech)")
+    ap.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    ap.add_argument("--repeats", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'minutes':>7}  {'chunks':>6}  {'words/chunk':>11}  {'workers':>7}  {'seconds':>8}  {'speedup':>7}  {'same':>5}")
+    for minutes in args.minutes:
+        data = parse_transcript_lines(synthetic_transcript(minutes, args.lines_per_minute))
+        texts = [c["text"] for c in chunk_transcript(data, determine_chunk_size(data))]
+        words = sum(len(t.split()) for t in texts) / len(texts)
+        serial_s, expected = timed(lambda: extract_keywords_batch(texts, workers=1), args.repeats)
+        print(f"{minutes:>7}  {len(texts):>6}  {words:>11.0f}  {'serial':>7}  {serial_s:>8.3f}  {1.0:>7.2f}  {'-':>5}")
+        for w in args.workers:
+            get_keyword_pool(w)
+            extract_keywords_batch(texts[:w], workers=w, min_parallel=1)  # spawn + warm the workers outside the timing
+            par_s, got = timed(lambda: extract_keywords_batch(texts, workers=w, min_parallel=1), args.repeats)
+            print(f"{minutes:>7}  {len(texts):>6}  {words:>11.0f}  {w:>7}  {par_s:>8.3f}  {serial_s / par_s:>7.2f}  {str(got == expected):>5}")
+            shutdown_keyword_pool()
+
+if __name__ == "__main__":
+    main()
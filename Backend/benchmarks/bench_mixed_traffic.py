@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# bench_mixed_traffic.py
+# Mixed-traffic load generator: frame predictions + transcriptions + health checks
+# against a running backend. Run once against the old build and once against the
+# new one to compare throughput and tail latency.
+#
+#   uvicorn Backend.main:app --port 8000
+#   python Backend/benchmarks/bench_mixed_traffic.py --image face.jpg --audio doubt.wav
+#
+# Requires: pip install httpx
+
+import argparse, asyncio, time
+from collections import defaultdict
+import numpy as np
+import httpx
+
+def pct(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+async def worker(client, kind, payload, deadline, lat, codes):
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            if kind == "predict":
+                r = await client.post("/predict/face_emotion", files={"file": ("frame.jpg", payload, "image/jpeg")})
+            elif kind == "asr":
+                r = await client.post("/asr/transcribe", files={"file": ("doubt.wav", payload, "audio/wav")})
+            else:
+                r = await client.get("/health")
+            codes[kind][r.status_code] += 1
+        except httpx.HTTPError as e:
+            codes[kind][type(e).__name__] += 1
+            continue
+        lat[kind].append((time.perf_counter() - t0) * 1000.0)
+
+async def run(args):
+    with open(args.image, "rb") as f: image = f.read()
+    audio = None
+    if args.audio:
+        with open(args.audio, "rb") as f: audio = f.read()
+
+    lat = defaultdict(list)
+    codes = defaultdict(lambda: defaultdict(int))
+    limits = httpx.Limits(max_connections=args.frames + args.asr + args.health + 8)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        deadline = time.perf_counter() + args.duration
+        tasks = [worker(client, "predict", image, deadline, lat, codes) for _ in range(args.frames)]
+        if audio is not None:
+            tasks += [worker(client, "asr", audio, deadline, lat, codes) for _ in range(args.asr)]
+        tasks += [worker(client, "health", None, deadline, lat, codes) for _ in range(args.health)]
+        await asyncio.gather(*tasks)
+
+    print(f"{'endpoint':10s} {'req/s':>8s} {'p50 ms':>9s} {'p99 ms':>9s} {'max ms':>9s}  status codes")
+    for kind in ("predict", "asr", "health"):
+        if kind not in codes: continue
+        v = lat[kind]
+        print(f"{kind:10s} {len(v)/args.duration:8.1f} {pct(v,50):9.1f} {pct(v,99):9.1f} "
+              f"{(max(v) if v else 0.0):9.1f}  {dict(codes[kind])}")
+
+def main():
+    ap = argparse.ArgumentParser("Mixed FER/ASR/health traffic benchmark")
+    ap.add_argument("--url", default="http://localhost:8000")
+    ap.add_argument("--image", required=True, help="JPEG frame sent to /predict/face_emotion")
+    ap.add_argument("--audio", default=None, help="Audio clip sent to /asr/transcribe")
+    ap.add_argument("--frames", type=int, default=40, help="Concurrent webcam clients")
+    ap.add_argument("--asr", type=int, default=2, help="Concurrent transcription clients")
+    ap.add_argument("--health", type=int, default=1, help="Concurrent health-check clients")
+    ap.add_argument("--duration", type=float, default=30.0)
+    ap.add_argument("--timeout", type=float, default=60.0)
+    asyncio.run(run(ap.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# bench_preprocess.py
+# Microbenchmark: reference TRANSFORM pipeline vs the fast grayscale decode path.
+#
+#   python -m Backend.benchmarks.bench_preprocess --image frame.jpg --batch 32
+
+import argparse, io, time
+import numpy as np
+import torch
+from PIL import Image
+
+from Backend.fer_router import TRANSFORM
+from Backend.fer_preprocess import BatchBuffer, decode_gray
+
+def reference(frames):
+    return torch.stack([TRANSFORM(Image.open(io.BytesIO(b)).convert("RGB")) for b in frames])
+
+def fast(frames, buf):
+    return buf.collate([decode_gray(b) for b in frames])
+
+def timeit(fn, iters):
+    fn()
+    t = []
+    for _ in range(iters):
+        t0 = time.perf_counter(); fn(); t.append((time.perf_counter() - t0) * 1000.0)
+    return float(np.median(t))
+
+def main():
+    ap = argparse.ArgumentParser("FER preprocessing microbenchmark")
+    ap.add_argument("--image", default=None, help="JPEG frame (default: synthetic 640x480 noise)")
+    ap.add_argument("--batch", type=int, default=32)
+    ap.add_argument("--iters", type=int, default=20)
+    args = ap.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as f: jpg = f.read()
+    else:
+        rgb = (np.random.rand(480, 640, 3) * 255).astype(np.uint8)
+        out = io.BytesIO(); Image.fromarray(rgb).save(out, "JPEG", quality=85); jpg = out.getvalue()
+    frames = [jpg] * args.batch
+    buf = BatchBuffer(args.batch)
+
+    ref_ms = timeit(lambda: reference(frames), args.iters)
+    fast_ms = timeit(lambda: fast(frames, buf), args.iters)
+    diff = (reference(frames[:1]) - fast(frames[:1], buf)).abs()
+    print(f"batch={args.batch}  TRANSFORM: {ref_ms:.2f} ms ({ref_ms/args.batch:.3f}/frame)  "
+          f"fast: {fast_ms:.2f} ms ({fast_ms/args.batch:.3f}/frame)  speedup x{ref_ms/fast_ms:.2f}")
+    print(f"pixel diff vs TRANSFORM (normalized units): mean {diff.mean():.4f}  max {diff.max():.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# bench_topic_k.py
+# Topic clustering cost and quality, fixed k (<= 5, fitted on everything) vs
+# adaptive k (silhouette over k = 2..TOPIC_K_MAX on a sample, then assignment).
+# Synthetic unit-norm "embeddings" drawn around --true-k centres stand in for
+# doubt embeddings so large sizes do not need the sentence model.
+#
+#   python -m Backend.benchmarks.bench_topic_k --sizes 1000 10000 100000 --true-k 9
+
+import argparse, time
+
+import numpy as np
+from sklearn.datasets import make_blobs
+
+from Backend.topic_analysis import cluster_embeddings
+
+def synthetic_embeddings(n, true_k, dim, seed=0):
+    x, _ = make_blobs(n_samples=n, centers=true_k, n_features=dim, cluster_std=4.0, random_state=seed)
+    x = x.astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+def main():
+    ap = argparse.ArgumentParser("Topic k-selection benchmark")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    ap.add_argument("--true-k", type=int, default=9)
+    ap.add_argument("--dim", type=int, default=384)
+    args = ap.parse_args()
+
+    print(f"{'doubts':>8}  {'k_mode':>6}  {'k':>3}  {'seconds':>8}  {'silhouette':>10}  {'davies_bouldin':>14}")
+    for n in args.sizes:
+        x = synthetic_embeddings(n, args.true_k, args.dim)
+        for k_mode in ("fixed", "auto"):
+            t0 = time.perf_counter()
+            _, _, q = cluster_embeddings(x, k_mode)
+            dt = time.perf_counter() - t0
+            print(f"{n:>8}  {k_mode:>6}  {q['k']:>3}  {dt:>8.2f}  {q['silhouette']:>10}  {q['davies_bouldin']:>14}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# --- START OF FILE doubt_dedup.py ---
+import string
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+MAX_LOOP_TOKENS = 32     # longest repeated phrase collapsed by `collapse_repetition`
+SHINGLE_CHARS = 4        # character n-grams of the normalized text
+MIN_JACCARD = 0.7        # shingle-set Jaccard at or above which two doubts are the same doubt
+NUM_PERM = 128           # MinHash signature length
+LSH_BANDS = 32           # 4 rows per band: a pair at Jaccard 0.7 shares a band with p > 0.999
+_PRIME = 4294967311      # > 2**32, so the crc32 shingle hashes stay distinct
+_A, _B = np.random.default_rng(17).integers(1, 2**31, size=(2, NUM_PERM), dtype=np.uint64)
+_KEEP = set(string.ascii_lowercase + string.digits + "'")
+_STRIP = str.maketrans("", "", "".join(c for c in map(chr, range(128)) if c not in _KEEP))
+# Words two doubts may differ by and still be the same doubt. Deliberately small:
+# negations and directions ("not", "up", "down") change the question.
+FILLER_WORDS = frozenset("""
+    a an the is are was were be been am do does did of to in on at for with by
+    i me my you your it its this that so and or please can could would just
+    really actually basically again um uh hmm okay ok sir maam
+""".split())
+
+
+def _norm_token(token):
+    return token.lower().translate(_STRIP)
+
+
+def collapse_repetition(text, max_n=MAX_LOOP_TOKENS):
+    """
+    Collapses Whisper-style looped output: a phrase of up to `max_n` words repeated
+    back-to-back is kept once (a single doubled word is left alone), and a cut-off
+    partial repeat at the end is dropped. Comparison ignores case and punctuation.
+    """
+    tokens = text.split()
+    if len(tokens) < 2:
+        return text.strip()
+    kept, norm = [], []
+    loop_end, loop_n = -1, 0
+    for token in tokens:
+        kept.append(token)
+        norm.append(_norm_token(token))
+        last = norm[-1]
+        for n in range(1, min(max_n, len(norm) // 2) + 1):
+            if norm[-1 - n] != last or norm[-n:] != norm[-2 * n:-n]:
+                continue
+            if n == 1 and (len(norm) < 3 or norm[-3] != norm[-1]):
+                continue
+            del kept[-n:], norm[-n:]
+            loop_end, loop_n = len(norm), n
+            break
+    tail = norm[loop_end:] if loop_end >= 0 else []
+    if tail and len(tail) < loop_n:
+        head = norm[loop_end - loop_n:loop_end - loop_n + len(tail)]
+        # The last word may itself be cut off ("... I didn't get a de").
+        if tail[:-1] == head[:-1] and head[-1].startswith(tail[-1]):
+            del kept[loop_end:]
+    return " ".join(kept)
+
+
+def _normalize(text):
+    return " ".join(w for w in (_norm_token(t) for t in text.split()) if w)
+
+
+def shingles(text, n=SHINGLE_CHARS):
+    """Character n-grams of the normalized text (word boundaries included)."""
+    padded = f" {_normalize(text)} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+def minhash(shingle_set):
+    """NUM_PERM-value MinHash signature of a shingle set."""
+    x = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingle_set), dtype=np.uint64, count=len(shingle_set))
+    return ((_A[:, None] * x[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def content_skeleton(normalized):
+    """Non-filler words of a normalized doubt, joined without spaces. Doubts that differ
+    only by FILLER_WORDS or word spacing ("back propagation") share a skeleton."""
+    return "".join(w for w in normalized.split() if w not in FILLER_WORDS)
+
+
+def dedup_doubts(texts, min_jaccard=MIN_JACCARD):
+    """
+    Drops near-duplicate doubts. Returns (unique_texts, weights, index) where
+    weights[j] is how many input texts unique_texts[j] stands for and index[i]
+    is the representative of texts[i]. Candidates come from MinHash LSH band
+    buckets (roughly linear in the number of texts) and are confirmed with the
+    exact shingle Jaccard (>= `min_jaccard`). A merge also needs the same content
+    skeleton, so "... in cnn" and "... in rnn" stay apart however close they look.
+    """
+    uniques, weights, shingle_sets, skeletons, index = [], [], [], [], []
+    exact = {}
+    buckets = defaultdict(list)
+    rows = NUM_PERM // LSH_BANDS
+    for text in texts:
+        key = _normalize(text)
+        j = exact.get(key)
+        if j is None:
+            sh = shingles(text)
+            skeleton = content_skeleton(key)
+            signature = minhash(sh)
+            bands = [(b, signature[b * rows:(b + 1) * rows].tobytes()) for b in range(LSH_BANDS)]
+            seen = set()
+            for band in bands:
+                for candidate in buckets[band]:
+                    if candidate not in seen:
+                        seen.add(candidate)
+                        if skeletons[candidate] == skeleton and jaccard(sh, shingle_sets[candidate]) >= min_jaccard:
+                            j = candidate
+                            break
+                if j is not None:
+                    break
+            if j is None:
+                j = len(uniques)
+                uniques.append(text)
+                weights.append(0)
+                shingle_sets.append(sh)
+                skeletons.append(skeleton)
+                for band in bands:
+                    buckets[band].append(j)
+            exact[key] = j
+        weights[j] += 1
+        index.append(j)
+    return uniques, weights, index
+
+
+def prepare_doubts(texts):
+    """Read-time stage: collapse loops in each doubt, then merge near-duplicates -> (texts, weights)."""
+    texts = [t for t in texts if t]
+    collapsed = {t: collapse_repetition(t) for t in set(texts)}
+    uniques, weights, _ = dedup_doubts([collapsed[t] for t in texts])
+    return uniques, weights
+# --- END OF FILE doubt_dedup.py ---
@@ -0,0 +1,108 @@
+# --- START OF FILE doubt_mapping.py ---
+import os
+
+import numpy as np
+
+MAP_TOP_K = int(os.environ.get("DOUBT_MAP_TOP_K", 1))                   # chunks each doubt is counted against
+MAP_BLOCK_ROWS = int(os.environ.get("DOUBT_MAP_BLOCK_ROWS", 4096))      # doubts per similarity block, at most
+MAP_BLOCK_MB = float(os.environ.get("DOUBT_MAP_BLOCK_MB", 64))          # ...and at most this much similarity matrix
+MAP_ANN = os.environ.get("DOUBT_MAP_ANN", "auto")                       # auto | off
+# HNSW only beats blocked BLAS once the index is large (see benchmarks/bench_doubt_mapping.py):
+MAP_ANN_MIN_PAIRS = int(os.environ.get("DOUBT_MAP_ANN_MIN_PAIRS", 1_000_000_000))  # doubts x chunks before ANN
+# Per-lecture mapping has tens of chunks, so with these defaults the ANN path is never taken
+# in practice; only the benchmark (or lowered thresholds) exercises it.
+MAP_ANN_MIN_CHUNKS = int(os.environ.get("DOUBT_MAP_ANN_MIN_CHUNKS", 100_000))
+ANN_EF_SEARCH = int(os.environ.get("DOUBT_MAP_ANN_EF", 64))
+
+
+def normalize(x):
+    """Row-wise L2 normalization, so cosine similarity is a dot product."""
+    x = np.asarray(x, dtype=np.float32)
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+
+def block_rows_for(n_chunks):
+    """Doubts per block so that one block of similarities stays within MAP_BLOCK_MB."""
+    return int(max(1, min(MAP_BLOCK_ROWS, MAP_BLOCK_MB * 2**20 // (4 * max(n_chunks, 1)))))
+
+
+def top_k_exact(doubts, chunks, k=1, block_rows=None):
+    """
+    Exact top-k chunks per doubt for normalized embeddings -> (idx, sims), both
+    (n_doubts, k). The similarity matrix is built `block_rows` doubts at a time,
+    so memory stays at block_rows x n_chunks floats.
+    """
+    n = doubts.shape[0]
+    block_rows = block_rows or block_rows_for(chunks.shape[0])
+    idx = np.empty((n, k), dtype=np.int64)
+    sims = np.empty((n, k), dtype=np.float32)
+    for start in range(0, n, block_rows):
+        block = doubts[start:start + block_rows] @ chunks.T
+        if k == 1:
+            best = block.argmax(axis=1)[:, None]
+        else:
+            best = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        idx[start:start + len(block)] = best
+        sims[start:start + len(block)] = np.take_along_axis(block, best, axis=1)
+    return idx, sims
+
+
+def top_k_ann(doubts, chunks, k=1, block_rows=MAP_BLOCK_ROWS, ef_search=ANN_EF_SEARCH):
+    """Approximate top-k via a faiss HNSW inner-product index over the chunks (idx -1 where none found)."""
+    import faiss
+    index = faiss.IndexHNSWFlat(chunks.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efSearch = max(ef_search, 2 * k)
+    index.add(np.ascontiguousarray(chunks))
+    idx = np.empty((doubts.shape[0], k), dtype=np.int64)
+    sims = np.empty((doubts.shape[0], k), dtype=np.float32)
+    for start in range(0, doubts.shape[0], block_rows):
+        block = np.ascontiguousarray(doubts[start:start + block_rows])
+        sims[start:start + len(block)], idx[start:start + len(block)] = index.search(block, k)
+    return idx, sims
+
+
+def use_ann(n_doubts, n_chunks):
+    if MAP_ANN == "off" or n_chunks < MAP_ANN_MIN_CHUNKS or n_doubts * n_chunks < MAP_ANN_MIN_PAIRS:
+        return False
+    try:
+        import faiss  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def nearest_chunks(doubt_embeddings, chunk_embeddings, top_k=None, ann=None):
+    """
+    Top-k chunks for every doubt -> (idx, sims, method). Exact blocked matmul
+    unless the problem is large and faiss is installed (`ann` forces either way).
+    """
+    doubts, chunks = normalize(doubt_embeddings), normalize(chunk_embeddings)
+    k = max(1, min(MAP_TOP_K if top_k is None else top_k, chunks.shape[0]))
+    if ann is None:
+        ann = use_ann(doubts.shape[0], chunks.shape[0])
+    if ann:
+        return (*top_k_ann(doubts, chunks, k), "ann")
+    return (*top_k_exact(doubts, chunks, k), "exact")
+
+
+def aggregate(idx, sims, weights, n_chunks):
+    """Weighted per-chunk totals of the mapped doubts -> (num_doubts, total_similarity)."""
+    weights = np.repeat(np.asarray(weights, dtype=np.float64), idx.shape[1])
+    idx, sims = idx.ravel(), sims.ravel().astype(np.float64)
+    valid = idx >= 0
+    idx, sims, weights = idx[valid], sims[valid], weights[valid]
+    num_doubts = np.bincount(idx, weights=weights, minlength=n_chunks).round().astype(np.int64)
+    total_similarity = np.bincount(idx, weights=weights * sims, minlength=n_chunks)
+    return num_doubts, total_similarity
+
+
+def map_to_chunks(doubt_embeddings, chunk_embeddings, weights=None, top_k=None, ann=None):
+    """Maps each doubt to its top-k chunks and sums counts/similarities per chunk."""
+    n_chunks = len(chunk_embeddings)
+    if len(doubt_embeddings) == 0 or n_chunks == 0:
+        return np.zeros(n_chunks, dtype=np.int64), np.zeros(n_chunks, dtype=np.float64)
+    if weights is None:
+        weights = np.ones(len(doubt_embeddings))
+    idx, sims, _ = nearest_chunks(doubt_embeddings, chunk_embeddings, top_k=top_k, ann=ann)
+    return aggregate(idx, sims, weights, n_chunks)
+# --- END OF FILE doubt_mapping.py ---
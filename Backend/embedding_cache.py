@@ -0,0 +1,245 @@
+# --- START OF FILE embedding_cache.py ---
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process locking only
+    fcntl = None
+
+_SQL_BATCH = 500  # hashes per IN (...) lookup, under SQLite's bound-parameter limit
+
+
+def text_key(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class _FileLock:
+    """Cross-process lock (several uvicorn workers share the cache files)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._fh = None
+
+    def __enter__(self):
+        self._fh = open(self.path, "a+")
+        if fcntl is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_UN)
+        self._fh.close()
+
+
+@contextmanager
+def _transaction(conn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by the SHA-1 of the text.
+
+    Vectors live in one memory-mapped float32 matrix (`<ns>.f32`, rows x dim);
+    `<ns>.index.sqlite` maps text hash -> row plus a last-used tick for LRU
+    eviction. A lookup reads only the requested hashes and a miss inserts only
+    its new rows, so neither grows with the size of the cache. Evicted rows
+    become holes that are reused by later appends; when holes exceed
+    `compact_ratio` of the file, `compact` rewrites the matrix with only live
+    rows. Separate namespaces keep vectors from different models/precisions apart.
+    """
+
+    def __init__(self, directory, namespace, max_rows=200_000, compact_ratio=0.25):
+        self.directory = directory
+        self.namespace = re.sub(r"[^A-Za-z0-9_.-]", "_", namespace)
+        self.max_rows = max_rows
+        self.compact_ratio = compact_ratio
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.namespace)
+        self.matrix_path = base + ".f32"
+        self.index_path = base + ".index.sqlite"
+        self.lock_path = base + ".lock"
+        self._lock = threading.Lock()
+        self._conn = None
+        self._matrix = None
+        self._open_shape = None  # (capacity, dim, generation) the memmap was opened with
+        self.dim = None
+        self.capacity = 0
+        self.next_row = 0    # rows ever handed out since the last compaction (live + holes)
+        self.live = 0
+        self.tick = 0
+        self.generation = 0  # bumped by compaction, so other workers reopen the matrix
+        self.hits = 0
+        self.misses = 0
+
+    # --- persistence ---
+    def _db(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (hash TEXT PRIMARY KEY, row INTEGER NOT NULL, tick INTEGER NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_tick ON entries (tick)")
+            conn.execute("CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY)")
+            self._conn = conn
+        return self._conn
+
+    def _load_meta(self):
+        """Picks up counters written by other workers and reopens the matrix if it was grown or compacted."""
+        meta = dict(self._db().execute("SELECT key, value FROM meta"))
+        self.dim = meta.get("dim") or None
+        self.capacity = meta.get("capacity", 0)
+        self.next_row = meta.get("next_row", 0)
+        self.live = meta.get("live", 0)
+        self.tick = meta.get("tick", 0)
+        self.generation = meta.get("generation", 0)
+        if self._open_shape != (self.capacity, self.dim, self.generation):
+            self._open_matrix()
+
+    def _save_meta(self):
+        self._db().executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+            ("dim", self.dim or 0), ("capacity", self.capacity), ("next_row", self.next_row),
+            ("live", self.live), ("tick", self.tick), ("generation", self.generation),
+        ])
+
+    def _lookup(self, keys):
+        """hash -> row for the cached ones among `keys`."""
+        unique = list(dict.fromkeys(keys))
+        rows = {}
+        for start in range(0, len(unique), _SQL_BATCH):
+            part = unique[start:start + _SQL_BATCH]
+            marks = ",".join("?" * len(part))
+            rows.update(self._db().execute(f"SELECT hash, row FROM entries WHERE hash IN ({marks})", part))
+        return rows
+
+    def _touch(self, keys):
+        self.tick += 1
+        self._db().executemany("UPDATE entries SET tick = ? WHERE hash = ?", [(self.tick, k) for k in dict.fromkeys(keys)])
+
+    def _open_matrix(self):
+        self._matrix = None
+        if self.capacity and self.dim:
+            self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dim))
+        self._open_shape = (self.capacity, self.dim, self.generation)
+
+    def _ensure_capacity(self, needed):
+        if needed <= self.capacity:
+            return
+        new_capacity = max(needed, self.capacity * 2, 1024)
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        with open(self.matrix_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self.capacity = new_capacity
+        self._open_matrix()
+
+    # --- eviction / compaction ---
+    def _evict(self, keep):
+        overflow = self.live - self.max_rows
+        if overflow <= 0:
+            return
+        conn = self._db()
+        # `keep` was just touched, so it sorts last; over-fetch by its size and skip it.
+        oldest = conn.execute("SELECT hash, row FROM entries ORDER BY tick LIMIT ?", (overflow + len(keep),)).fetchall()
+        victims = [(k, row) for k, row in oldest if k not in keep][:overflow]
+        conn.executemany("DELETE FROM entries WHERE hash = ?", [(k,) for k, _ in victims])
+        conn.executemany("INSERT OR IGNORE INTO free_rows (row) VALUES (?)", [(row,) for _, row in victims])
+        self.live -= len(victims)
+
+    def compact(self):
+        """Rewrites the matrix with only live rows (call under the file lock, inside an index transaction)."""
+        conn = self._db()
+        live = conn.execute("SELECT hash, row FROM entries ORDER BY row").fetchall()
+        vectors = np.array(self._matrix[[row for _, row in live]]) if live else np.zeros((0, self.dim), np.float32)
+        self._matrix = None
+        self.capacity = max(len(live), 1024)
+        with open(self.matrix_path, "wb") as f:
+            f.truncate(self.capacity * self.dim * 4)
+        self.generation += 1
+        self._open_matrix()
+        self._matrix[:len(live)] = vectors
+        conn.executemany("UPDATE entries SET row = ? WHERE hash = ?", [(i, k) for i, (k, _) in enumerate(live)])
+        conn.execute("DELETE FROM free_rows")
+        self.next_row = self.live = len(live)
+
+    # --- public API ---
+    def get_or_encode(self, texts, encode_fn):
+        """Vectors for `texts` (one row each); only texts not yet cached are encoded.
+        Encoding happens outside the locks so concurrent callers can still batch."""
+        keys = [text_key(t) for t in texts]
+        if not keys:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+
+        with self._lock, _FileLock(self.lock_path):
+            self._load_meta()
+            rows = self._lookup(keys)
+            missing = [k for k in dict.fromkeys(keys) if k not in rows]
+            if not missing:
+                self.hits += len(keys)
+                with _transaction(self._db()):
+                    self._touch(keys)
+                    self._db().execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('tick', ?)", (self.tick,))
+                return np.array(self._matrix[[rows[k] for k in keys]])
+
+        wanted = set(missing)
+        first = {k: t for k, t in zip(keys, texts) if k in wanted}
+        vectors = np.asarray(encode_fn([first[k] for k in missing]), dtype=np.float32)
+
+        with self._lock, _FileLock(self.lock_path):
+            conn = self._db()
+            with _transaction(conn):
+                self._load_meta()
+                self.misses += len(missing)
+                self.hits += len(keys) - len(missing)
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                rows = self._lookup(keys)  # another worker may have added some meanwhile
+                todo = [(k, vec) for k, vec in zip(missing, vectors) if k not in rows]
+                reused = [row for (row,) in conn.execute("SELECT row FROM free_rows ORDER BY row LIMIT ?", (len(todo),))]
+                fresh = len(todo) - len(reused)
+                self._ensure_capacity(self.next_row + fresh)
+                slots = reused + list(range(self.next_row, self.next_row + fresh))
+                if todo:
+                    self._matrix[slots] = np.stack([vec for _, vec in todo])
+                conn.executemany("DELETE FROM free_rows WHERE row = ?", [(row,) for row in reused])
+                conn.executemany("INSERT INTO entries (hash, row, tick) VALUES (?, ?, ?)",
+                                 [(k, slot, self.tick) for (k, _), slot in zip(todo, slots)])
+                self.next_row += fresh
+                self.live += len(todo)
+
+                self._touch(keys)
+                self._evict(keep=set(keys))
+                if self.next_row - self.live > self.compact_ratio * self.next_row:
+                    self.compact()
+                self._matrix.flush()
+                self._save_meta()
+                rows = self._lookup(keys)
+            return np.array(self._matrix[[rows[k] for k in keys]])
+
+    def stats(self):
+        return {
+            "namespace": self.namespace,
+            "rows": self.live,
+            "capacity": self.capacity,
+            "free_rows": self.next_row - self.live,
+            "max_rows": self.max_rows,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+# --- END OF FILE embedding_cache.py ---
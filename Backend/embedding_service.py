@@ -0,0 +1,173 @@
+# --- START OF FILE embedding_service.py ---
+import os
+import threading
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+from sentence_transformers import SentenceTransformer
+
+from .model_registry import REGISTRY
+from .embedding_cache import EmbeddingCache
+
+# --- GLOBAL/CACHE: one SentenceTransformer per worker, shared by all routers ---
+SENTENCE_MODEL = None
+EMBEDDER_REGISTRY_NAME = "sentence_embedder"
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+ENCODE_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", 64))
+ENCODE_MAX_WAIT_MS = float(os.environ.get("EMBED_MAX_WAIT_MS", 5))
+EMBED_CACHE_DIR = os.environ.get("EMBED_CACHE_DIR", "Backend/embedding_cache")
+EMBED_CACHE_MAX_ROWS = int(os.environ.get("EMBED_CACHE_MAX_ROWS", 200000))
+CACHES = {}
+
+
+def resolve_device(device):
+    if device in (None, "auto"):
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    return device
+
+
+def build_embedder(name, config):
+    """
+    Registry loader. Config keys: model, device ("auto" | "cpu" | "cuda"),
+    precision ("fp32" | "fp16" on GPU | "int8" dynamic quantization on CPU),
+    warmup (encode a dummy sentence so the first real request is not slow).
+    """
+    device = resolve_device(config.get("device", "auto"))
+    precision = config.get("precision", "fp32")
+    print(f"Loading shared SentenceTransformer ({config.get('model', DEFAULT_MODEL_NAME)}, {device}, {precision})...")
+    model = SentenceTransformer(config.get("model", DEFAULT_MODEL_NAME), device=device)
+    if precision == "fp16" and device.startswith("cuda"):
+        model = model.half()
+    elif precision == "int8" and device == "cpu":
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    elif precision != "fp32":
+        print(f"WARN: precision '{precision}' is not supported on {device}; using fp32.")
+    if config.get("warmup", True):
+        model.encode(["warm up"], show_progress_bar=False)
+    print("SentenceTransformer loaded.")
+    return model
+
+
+def install_embedder(name, model):
+    global SENTENCE_MODEL
+    SENTENCE_MODEL = model
+
+
+REGISTRY.register_loader(
+    "sentence", build_embedder, install_embedder,
+    defaults={EMBEDDER_REGISTRY_NAME: {"model": DEFAULT_MODEL_NAME, "device": "auto", "precision": "fp32", "warmup": True}},
+    override_keys=("device", "precision", "warmup"),
+)
+
+
+def load_embedder():
+    """Returns the shared sentence transformer, loading it through the registry if needed."""
+    if SENTENCE_MODEL is None:
+        REGISTRY.get(EMBEDDER_REGISTRY_NAME)
+    if SENTENCE_MODEL is None:
+        raise RuntimeError("SentenceTransformer failed to load; see /models.")
+    return SENTENCE_MODEL
+
+
+class _EncodeRequest:
+    def __init__(self, texts):
+        self.texts = texts
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class EncodeBatcher:
+    """
+    Coalesces `encode` calls from concurrent request threads.
+
+    The first caller to find no batch in progress becomes the leader: it waits
+    up to `max_wait_ms` for other callers, then encodes everybody's texts
+    (deduplicated) in one `model.encode` call and hands each caller its rows.
+    """
+
+    def __init__(self, max_wait_ms=ENCODE_MAX_WAIT_MS, batch_size=ENCODE_BATCH_SIZE):
+        self.max_wait = max_wait_ms / 1000.0
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending = []
+        self._leader_active = False
+        self.calls = 0
+        self.batches = 0
+        self.texts = 0
+        self.unique_texts = 0
+
+    def encode(self, texts):
+        request = _EncodeRequest(list(texts))
+        with self._lock:
+            self.calls += 1
+            self._pending.append(request)
+            lead = not self._leader_active
+            if lead:
+                self._leader_active = True
+        if lead:
+            self._lead()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _lead(self):
+        if self.max_wait > 0:
+            time.sleep(self.max_wait)
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._leader_active = False
+        try:
+            unique = list(dict.fromkeys(t for r in batch for t in r.texts))
+            index = {t: i for i, t in enumerate(unique)}
+            vectors = load_embedder().encode(unique, batch_size=self.batch_size, show_progress_bar=False) if unique else None
+            with self._lock:
+                self.batches += 1
+                self.texts += sum(len(r.texts) for r in batch)
+                self.unique_texts += len(unique)
+            for r in batch:
+                if vectors is None or not r.texts:
+                    r.result = np.zeros((0, 0), dtype=np.float32)
+                else:
+                    r.result = vectors[[index[t] for t in r.texts]]
+        except Exception as e:
+            for r in batch:
+                r.error = e
+        finally:
+            for r in batch:
+                r.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "batches": self.batches, "texts": self.texts, "unique_texts": self.unique_texts}
+
+
+ENCODER = EncodeBatcher()
+
+
+def encode(texts):
+    """Embeds `texts` with the shared model (np.ndarray, one row per text)."""
+    return ENCODER.encode(texts)
+
+
+def get_cache():
+    """Persistent cache for the currently installed embedder (one namespace per model/precision)."""
+    entry = REGISTRY.entries.get(EMBEDDER_REGISTRY_NAME)
+    config = entry.config if entry is not None else {}
+    namespace = f"{config.get('model', DEFAULT_MODEL_NAME)}-{config.get('precision', 'fp32')}"
+    if namespace not in CACHES:
+        CACHES[namespace] = EmbeddingCache(EMBED_CACHE_DIR, namespace, max_rows=EMBED_CACHE_MAX_ROWS)
+    return CACHES[namespace]
+
+
+def cache_stats():
+    return [cache.stats() for cache in CACHES.values()]
+
+
+def encode_cached(texts):
+    """Like `encode`, but vectors of previously seen texts come from the on-disk cache."""
+    return get_cache().get_or_encode(list(texts), encode)
+# --- END OF FILE embedding_service.py ---
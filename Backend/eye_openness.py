@@ -0,0 +1,111 @@
+# --- START OF FILE eye_openness.py ---
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class EyeState:
+    """Per-session eye-closure state (the prototype's `closed_count`, plus rate limiting)."""
+
+    def __init__(self):
+        self.closed_count = 0
+        self.frames_since_check = None  # None => check on the next frame
+        self.left = 0.0
+        self.right = 0.0
+        self.override = False
+
+
+class EyeOpenness:
+    """
+    Server-side port of `EyeOpenness` from prev_file/live_fer13_eyes.py.
+
+    Eye aspect ratios come from MediaPipe Face Mesh landmarks. If both eyes are
+    below `eye_open_thresh` for `consec_needed` consecutive *checked* frames the
+    session is flagged eyes-closed and the engagement score is overridden.
+
+    Landmarking only runs every `every_n` frames per session; frames in between
+    reuse the session's last verdict, so the added cost is roughly 1/every_n of
+    one Face Mesh call per frame.
+    """
+
+    # indices: [outer, upper, inner, lower, upper2, lower2]
+    L = [33, 159, 133, 145, 158, 153]
+    R = [263, 386, 362, 374, 385, 380]
+
+    def __init__(self, eye_open_thresh=0.22, consec_needed=3, every_n=3):
+        import mediapipe as mp  # optional dependency
+        self.mp = mp
+        self.eye_open_thresh = eye_open_thresh
+        self.consec_needed = consec_needed
+        self.every_n = max(1, every_n)
+        self._local = threading.local()  # FaceMesh graphs are not thread-safe
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.checks = 0
+        self.total_ms = 0.0
+        self.check_ms = deque(maxlen=512)
+
+    def _mesh(self):
+        if getattr(self._local, "mesh", None) is None:
+            # static_image_mode: one instance serves many sessions, so no cross-frame tracking.
+            self._local.mesh = self.mp.solutions.face_mesh.FaceMesh(
+                static_image_mode=True, max_num_faces=1, refine_landmarks=True,
+                min_detection_confidence=0.5,
+            )
+        return self._local.mesh
+
+    def _eye_ratio(self, lms, idxs):
+        pts = np.array([(lms[i].x, lms[i].y) for i in idxs], dtype=np.float32)
+        v = (np.linalg.norm(pts[1]-pts[3]) + np.linalg.norm(pts[4]-pts[5]))/2.0  # vertical avg
+        h = np.linalg.norm(pts[0]-pts[2]) + 1e-6                                 # horizontal
+        return float(v/h)
+
+    def _check(self, gray, state):
+        rgb = np.ascontiguousarray(np.repeat(gray[:, :, None], 3, axis=2))
+        res = self._mesh().process(rgb)
+        if not res.multi_face_landmarks:
+            # no face: decay counter slowly, don't force closed
+            state.closed_count = max(0, state.closed_count-1)
+            return
+
+        lms = res.multi_face_landmarks[0].landmark
+        state.left = self._eye_ratio(lms, self.L)
+        state.right = self._eye_ratio(lms, self.R)
+        if state.left < self.eye_open_thresh and state.right < self.eye_open_thresh:
+            state.closed_count += 1
+        else:
+            state.closed_count = max(0, state.closed_count-1)
+
+    def update(self, gray, state):
+        """Advances `state` by one frame (landmarking only when due); returns the override flag."""
+        t0 = time.perf_counter()
+        due = state.frames_since_check is None or state.frames_since_check + 1 >= self.every_n
+        if due:
+            self._check(gray, state)
+            state.frames_since_check = 0
+            state.override = state.closed_count >= self.consec_needed
+        else:
+            state.frames_since_check += 1
+        elapsed = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            self.frames += 1
+            self.total_ms += elapsed
+            if due:
+                self.checks += 1
+                self.check_ms.append(elapsed)
+        return state.override
+
+    def stats(self):
+        with self._lock:
+            checks = np.asarray(self.check_ms, dtype=np.float64)
+            return {
+                "every_n": self.every_n,
+                "frames": self.frames,
+                "landmark_runs": self.checks,
+                "added_ms_per_frame": round(self.total_ms / self.frames, 3) if self.frames else 0.0,
+                "landmark_ms_mean": round(float(checks.mean()), 3) if checks.size else 0.0,
+                "landmark_ms_p95": round(float(np.percentile(checks, 95)), 3) if checks.size else 0.0,
+            }
+# --- END OF FILE eye_openness.py ---
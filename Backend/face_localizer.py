@@ -0,0 +1,178 @@
+# --- START OF FILE face_localizer.py ---
+import threading
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:  # optional dependency: face cropping is disabled without OpenCV
+    cv2 = None
+
+
+class FaceTrack:
+    """Per-session tracking state: last box (full-res coords) and its template."""
+
+    def __init__(self):
+        self.box = None            # (x, y, w, h) in full-resolution frame coords
+        self.template = None       # grayscale patch from the detection frame (small coords)
+        self.frames_since_detect = 0
+
+
+class FaceLocalizer:
+    """
+    Largest-face crop for the classifier, kept cheap for live streams.
+
+    Detection (Haar cascade, as in prev_file/live_fer13_eyes.py) runs on a copy
+    of the frame downscaled to `detect_width`. Between detections the last box
+    is followed with normalized template matching in a small search window; a
+    full re-detect happens every `redetect_every` frames or when the match
+    score drops below `track_thresh` (tracking loss).
+    """
+
+    def __init__(self, detect_width=160, redetect_every=5, track_thresh=0.6, pad=0.15, min_face=24):
+        if cv2 is None:
+            raise RuntimeError("OpenCV (cv2) is required for face localization.")
+        self.detect_width = detect_width
+        self.redetect_every = max(1, redetect_every)
+        self.track_thresh = track_thresh
+        self.pad = pad
+        self.min_face = min_face
+        self._local = threading.local()  # CascadeClassifier is not thread-safe
+        if self._cascade().empty():
+            raise RuntimeError("Could not load the Haar face cascade.")
+        self.detections = 0
+        self.tracked = 0
+        self.losses = 0
+        self.misses = 0
+
+    def _cascade(self):
+        if getattr(self._local, "cascade", None) is None:
+            self._local.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        return self._local.cascade
+
+    def downscale(self, gray):
+        scale = min(1.0, self.detect_width / gray.shape[1])
+        if scale == 1.0:
+            return gray, 1.0
+        small = cv2.resize(gray, (int(gray.shape[1] * scale), int(gray.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+        return small, scale
+
+    def detect_all(self, small):
+        """All face boxes (x, y, w, h) in `small` coords."""
+        faces = self._cascade().detectMultiScale(small, 1.1, 3, minSize=(self.min_face, self.min_face))
+        return [tuple(int(v) for v in f) for f in faces]
+
+    def _track(self, small, track, scale):
+        x, y, w, h = (int(round(v * scale)) for v in track.box)
+        th, tw = track.template.shape
+        mx, my = w // 2, h // 2
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(small.shape[1], x + w + mx), min(small.shape[0], y + h + my)
+        window = small[y0:y1, x0:x1]
+        if window.shape[0] < th or window.shape[1] < tw:
+            return False
+        res = cv2.matchTemplate(window, track.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (bx, by) = cv2.minMaxLoc(res)
+        if score < self.track_thresh:
+            return False
+        track.box = ((x0 + bx) / scale, (y0 + by) / scale, tw / scale, th / scale)
+        return True
+
+    def locate(self, gray, track=None):
+        """Returns the face box (x, y, w, h) in `gray` coords, or None if no face."""
+        track = track if track is not None else FaceTrack()
+        small, scale = self.downscale(gray)
+
+        if track.box is not None and track.frames_since_detect < self.redetect_every:
+            track.frames_since_detect += 1
+            if self._track(small, track, scale):
+                self.tracked += 1
+                return track.box
+            self.losses += 1
+
+        self.detections += 1
+        faces = self.detect_all(small)
+        track.frames_since_detect = 0
+        if not faces:
+            self.misses += 1
+            track.box = track.template = None
+            return None
+        x, y, w, h = max(faces, key=lambda b: b[2] * b[3])
+        track.template = small[y:y + h, x:x + w].copy()
+        track.box = (x / scale, y / scale, w / scale, h / scale)
+        return track.box
+
+    def crop(self, gray, box, size):
+        """Padded crop around `box`, resized to (size, size) uint8."""
+        x, y, w, h = box
+        p = self.pad * max(w, h)
+        x0, y0 = max(0, int(x - p)), max(0, int(y - p))
+        x1, y1 = min(gray.shape[1], int(x + w + p)), min(gray.shape[0], int(y + h + p))
+        roi = gray[y0:y1, x0:x1]
+        if roi.size == 0:
+            roi = gray
+        interp = cv2.INTER_AREA if roi.shape[0] > size else cv2.INTER_LINEAR
+        return np.ascontiguousarray(cv2.resize(roi, (size, size), interpolation=interp))
+
+    def stats(self):
+        return {
+            "detect_width": self.detect_width,
+            "redetect_every": self.redetect_every,
+            "detections": self.detections,
+            "tracked_frames": self.tracked,
+            "tracking_losses": self.losses,
+            "no_face": self.misses,
+        }
+
+
+def box_iou(a, b):
+    ax1, ay1, bx1, by1 = a[0] + a[2], a[1] + a[3], b[0] + b[2], b[1] + b[3]
+    iw = max(0.0, min(ax1, bx1) - max(a[0], b[0]))
+    ih = max(0.0, min(ay1, by1) - max(a[1], b[1]))
+    inter = iw * ih
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+
+class MultiFaceTracker:
+    """
+    Stable track ids for a fixed classroom camera.
+
+    Each frame's boxes are greedily matched to the previous frame's tracks by
+    IoU (highest first); unmatched boxes start new tracks and tracks unseen for
+    more than `max_missed` frames are dropped.
+    """
+
+    def __init__(self, iou_thresh=0.3, max_missed=10):
+        self.iou_thresh = iou_thresh
+        self.max_missed = max_missed
+        self.tracks = {}  # track_id -> [box, missed]
+        self.next_id = 1
+
+    def update(self, boxes):
+        """Returns one track id per box, in the same order."""
+        pairs = sorted(
+            ((box_iou(track[0], box), tid, i) for tid, track in self.tracks.items() for i, box in enumerate(boxes)),
+            reverse=True,
+        )
+        ids = [None] * len(boxes)
+        used = set()
+        for iou, tid, i in pairs:
+            if iou < self.iou_thresh:
+                break
+            if tid in used or ids[i] is not None:
+                continue
+            ids[i] = tid
+            used.add(tid)
+        for i, box in enumerate(boxes):
+            if ids[i] is None:
+                ids[i] = self.next_id
+                self.next_id += 1
+            self.tracks[ids[i]] = [box, 0]
+        for tid in list(self.tracks):
+            if tid not in ids:
+                self.tracks[tid][1] += 1
+                if self.tracks[tid][1] > self.max_missed:
+                    del self.tracks[tid]
+        return ids
+# --- END OF FILE face_localizer.py ---
@@ -0,0 +1,120 @@
+# --- START OF FILE fer_backends.py ---
+import copy
+import os
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+BACKENDS = ("eager", "torchscript", "compile", "onnx", "int8_dynamic", "int8_static")
+
+
+class OnnxRuntimeModule:
+    """Callable wrapper so an ONNX Runtime session can stand in for the torch model."""
+
+    def __init__(self, onnx_path, num_threads=0):
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            opts.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(onnx_path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, x):
+        x = x.detach().cpu().contiguous().numpy().astype(np.float32, copy=False)
+        return torch.from_numpy(self.session.run(None, {self.input_name: x})[0])
+
+    def eval(self):
+        return self
+
+
+def export_onnx(model, onnx_path, size=224):
+    example = torch.randn(1, 3, size, size)
+    kwargs = dict(
+        input_names=["input"], output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=17,
+    )
+    try:
+        torch.onnx.export(model, example, onnx_path, dynamo=False, **kwargs)
+    except TypeError:  # torch < 2.5 has no `dynamo` flag
+        torch.onnx.export(model, example, onnx_path, **kwargs)
+    return onnx_path
+
+
+def quantize_static(model, calibration_batches):
+    """FX graph-mode int8 post-training quantization (conv backbone + head)."""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    engine = "x86" if "x86" in torch.backends.quantized.supported_engines else "fbgemm"
+    torch.backends.quantized.engine = engine
+    example = calibration_batches[0]
+    prepared = prepare_fx(copy.deepcopy(model).eval(), get_default_qconfig_mapping(engine), (example,))
+    with torch.no_grad():
+        for batch in calibration_batches:
+            prepared(batch)
+    return convert_fx(prepared)
+
+
+def build_backend(model, backend, device="cpu", weights_path=None, calibration_batches=None, size=224):
+    """
+    Returns a callable mapping a (N, 3, size, size) float tensor to logits.
+
+    `model` is the eager fp32 TinyImgClassifier in eval mode. Quantized and ONNX
+    backends are CPU-only; on other devices they fall back to eager.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown FER backend '{backend}'. Choose one of {BACKENDS}.")
+    if backend == "eager":
+        return model
+    if backend in ("onnx", "int8_dynamic", "int8_static") and str(device) != "cpu":
+        print(f"WARN: FER backend '{backend}' is CPU-only; using eager on {device}.")
+        return model
+
+    example = torch.randn(1, 3, size, size, device=device)
+    if backend == "torchscript":
+        with torch.no_grad():
+            traced = torch.jit.trace(model, example)
+            return torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+    if backend == "compile":
+        return torch.compile(model, dynamic=True)
+    if backend == "onnx":
+        base = os.path.splitext(weights_path)[0] if weights_path else "Backend/fer_model"
+        onnx_path = export_onnx(model, base + ".onnx", size=size)
+        return OnnxRuntimeModule(onnx_path)
+    if backend == "int8_dynamic":
+        # Dynamic quantization only covers nn.Linear; the conv backbone stays fp32.
+        return torch.ao.quantization.quantize_dynamic(copy.deepcopy(model), {nn.Linear}, dtype=torch.qint8)
+    # int8_static
+    if not calibration_batches:
+        print("WARN: int8_static without calibration images; calibrating on random inputs.")
+        calibration_batches = [torch.randn(8, 3, size, size) for _ in range(4)]
+    return quantize_static(model, calibration_batches)
+
+
+def check_parity(reference, candidate, inputs):
+    """Compares candidate vs eager outputs on the same inputs."""
+    with torch.no_grad():
+        ref = torch.softmax(reference(inputs).float().cpu(), dim=1).numpy()
+        got = torch.softmax(candidate(inputs).float().cpu(), dim=1).numpy()
+    return {
+        "max_abs_prob_diff": float(np.abs(ref - got).max()),
+        "mean_abs_prob_diff": float(np.abs(ref - got).mean()),
+        "label_agreement": float((ref.argmax(1) == got.argmax(1)).mean()),
+    }
+
+
+def measure_latency(fn, inputs, warmup=3, iters=20):
+    with torch.no_grad():
+        for _ in range(warmup):
+            fn(inputs)
+        timings = []
+        for _ in range(iters):
+            t0 = time.perf_counter()
+            fn(inputs)
+            timings.append((time.perf_counter() - t0) * 1000.0)
+    return {"p50_ms": float(np.percentile(timings, 50)), "p95_ms": float(np.percentile(timings, 95))}
+# --- END OF FILE fer_backends.py ---
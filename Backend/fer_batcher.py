@@ -0,0 +1,169 @@
+# --- START OF FILE fer_batcher.py ---
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+import torch
+
+from .inference_executor import ExecutorSaturated
+
+
+class BatchStats:
+    """Rolling counters used to tune the batcher under load."""
+
+    def __init__(self, window=1024):
+        self.batches = 0
+        self.frames = 0
+        self.errors = 0
+        self.size_histogram = {}
+        self.queue_waits_ms = deque(maxlen=window)
+        self.forward_ms = deque(maxlen=window)
+
+    def record(self, batch_size, waits_ms, forward_ms):
+        self.batches += 1
+        self.frames += batch_size
+        self.size_histogram[batch_size] = self.size_histogram.get(batch_size, 0) + 1
+        self.queue_waits_ms.extend(waits_ms)
+        self.forward_ms.append(forward_ms)
+
+    def snapshot(self):
+        waits = np.asarray(self.queue_waits_ms, dtype=np.float64)
+        fwd = np.asarray(self.forward_ms, dtype=np.float64)
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "errors": self.errors,
+            "mean_batch_size": round(self.frames / self.batches, 3) if self.batches else 0.0,
+            "batch_size_histogram": dict(sorted(self.size_histogram.items())),
+            "queue_wait_ms": _summary(waits),
+            "forward_ms": _summary(fwd),
+        }
+
+
+def _summary(values):
+    if values.size == 0:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-frame requests into one forward pass.
+
+    Callers `await submit(item)` with one preprocessed frame and get back the
+    logits row for it. Items are turned into a batch tensor by `collate_fn`
+    (default: torch.stack of (C, H, W) tensors). A background task drains the queue, waiting at
+    most `max_wait_ms` after the first queued frame for up to `max_batch_size`
+    frames before stacking them and running the model once. The forward pass
+    runs on `executor` (an InferenceExecutor) so the event loop stays free.
+    `workers` consumer tasks drain the queue, so that many batches can be in
+    flight at once (match it to the executor's worker count).
+    """
+
+    def __init__(self, model, device, max_batch_size=32, max_wait_ms=10.0, max_queue=256, executor=None, collate_fn=None, workers=1):
+        self.model = model
+        self.device = device
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.max_queue = max(self.max_batch_size, int(max_queue))
+        self.executor = executor
+        self.collate_fn = collate_fn or torch.stack
+        self.workers = max(1, int(workers))
+        self.stats = BatchStats()
+        self._queue = None
+        self._tasks = []
+
+    def _ensure_worker(self):
+        if not self._tasks or all(task.done() for task in self._tasks):
+            self._queue = asyncio.Queue()
+            loop = asyncio.get_running_loop()
+            self._tasks = [loop.create_task(self._run()) for _ in range(self.workers)]
+
+    def pending(self):
+        """Items queued and not yet taken into a batch."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _enqueue(self, items):
+        """Queues items (all or none, bounded by `max_queue`) and returns their futures."""
+        self._ensure_worker()
+        if self._queue.qsize() + len(items) > self.max_queue:
+            raise ExecutorSaturated(f"Batch queue is full ({self._queue.qsize()} of {self.max_queue} pending).")
+        loop, now = asyncio.get_running_loop(), time.perf_counter()
+        futures = []
+        for item in items:
+            future = loop.create_future()
+            self._queue.put_nowait((item, future, now))
+            futures.append(future)
+        return futures
+
+    async def submit(self, item):
+        """Queues one preprocessed frame and waits for its logits (np.ndarray)."""
+        return await self._enqueue([item])[0]
+
+    async def submit_many(self, items):
+        """Queues several frames at once (all or none) and waits for their logits, in order."""
+        return await asyncio.gather(*self._enqueue(list(items)))
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                # Still take whatever is already queued without waiting.
+                while len(batch) < self.max_batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _forward(self, items):
+        x = self.collate_fn(items).to(self.device)
+        with torch.no_grad():
+            return self.model(x).float().cpu().numpy()
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            waits_ms = [(started - queued_at) * 1000.0 for _, _, queued_at in batch]
+            try:
+                items = [item for item, _, _ in batch]
+                if self.executor is None:
+                    logits = self._forward(items)
+                else:
+                    logits = await self.executor.run(self._forward, items)
+            except Exception as e:
+                self.stats.errors += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.stats.record(len(batch), waits_ms, (time.perf_counter() - started) * 1000.0)
+            for row, (_, future, _) in zip(logits, batch):
+                if not future.done():
+                    future.set_result(row)
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+# --- END OF FILE fer_batcher.py ---
@@ -0,0 +1,75 @@
+# --- START OF FILE fer_preprocess.py ---
+import io
+
+import numpy as np
+import torch
+from PIL import Image
+
+INPUT_SIZE = 224
+
+
+def decode_gray(image_bytes, size=INPUT_SIZE):
+    """
+    Decodes straight to an 8-bit (size, size) grayscale array.
+
+    For JPEGs, `draft` asks libjpeg for the luma plane only and lets it scale
+    down by 1/2, 1/4 or 1/8 during the IDCT, so a 640x480 webcam frame is never
+    materialized as full-size RGB. Other formats fall back to convert("L").
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    img.draft("L", (size, size))
+    if img.mode != "L":
+        img = img.convert("L")
+    if img.size != (size, size):
+        img = img.resize((size, size), Image.BILINEAR)
+    return np.asarray(img, dtype=np.uint8)
+
+
+def decode_gray_frame(image_bytes, min_size=(480, 360), with_scale=False):
+    """Grayscale decode that keeps the frame (no resize), still using draft-mode
+    scaling so the result is the smallest JPEG scale covering `min_size`. With
+    `with_scale`, also returns (sx, sy): upload pixels per decoded pixel."""
+    img = Image.open(io.BytesIO(image_bytes))
+    width, height = img.size
+    img.draft("L", min_size)
+    if img.mode != "L":
+        img = img.convert("L")
+    gray = np.asarray(img, dtype=np.uint8)
+    if with_scale:
+        return gray, (width / gray.shape[1], height / gray.shape[0])
+    return gray
+
+
+class BatchBuffer:
+    """
+    Preallocated float32 (max_batch, 1, size, size) buffer.
+
+    `collate` normalizes a list of uint8 frames into it with one vectorized
+    op ((x / 255 - 0.5) / 0.5) and returns a (N, 3, size, size) view that
+    expands the single gray channel instead of materializing three copies.
+    Only one batch may be in flight per buffer (the MicroBatcher guarantees it).
+    """
+
+    def __init__(self, max_batch=32, size=INPUT_SIZE):
+        self.size = size
+        self._u8 = np.empty((max_batch, size, size), dtype=np.uint8)
+        self._f32 = np.empty((max_batch, 1, size, size), dtype=np.float32)
+
+    def collate(self, frames):
+        n = len(frames)
+        if n > self._u8.shape[0]:
+            self.__init__(n, self.size)
+        u8 = self._u8[:n]
+        for i, frame in enumerate(frames):
+            u8[i] = frame
+        out = self._f32[:n]
+        np.multiply(u8[:, None], np.float32(2.0 / 255.0), out=out)
+        out -= np.float32(1.0)
+        return torch.from_numpy(out).expand(n, 3, self.size, self.size)
+
+
+def gray_to_tensor(frame):
+    """Single-frame (3, H, W) tensor, matching TRANSFORM's output layout."""
+    x = torch.from_numpy(frame).float().div_(127.5).sub_(1.0)
+    return x.unsqueeze(0).expand(3, -1, -1)
+# --- END OF FILE fer_preprocess.py ---
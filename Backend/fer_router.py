@@ -1,14 +1,24 @@
 # --- START OF FILE fer_router.py ---
-import io
+import os
 import time
+import asyncio
+import glob
+from typing import Optional
 import torch
 import torch.nn as nn
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, WebSocket, WebSocketDisconnect
 from torchvision import transforms
 from torchvision.models import mobilenet_v2
-from PIL import Image
 
-from .models import Prediction 
+from .models import Prediction, StreamPrediction, FacePrediction, ClassroomPrediction 
+from .fer_batcher import MicroBatcher
+from .inference_executor import ExecutorSaturated, get_executor, run_inference, RETRY_AFTER_SECONDS
+from .session_state import EngagementSmoother, FerSession, SessionStore, softmax_np
+from .fer_backends import build_backend, check_parity
+from .fer_preprocess import INPUT_SIZE, BatchBuffer, decode_gray, decode_gray_frame, gray_to_tensor
+from .face_localizer import FaceLocalizer, FaceTrack, MultiFaceTracker
+from .eye_openness import EyeOpenness, EyeState
+from .model_registry import REGISTRY
 
 router = APIRouter(
     prefix="/predict",
@@ -17,9 +27,64 @@ router = APIRouter(
 
 # --- GLOBALS (Model Definition and State) ---
 MODELS = {} 
+BATCHERS = {}
+BACKEND_INFO = {}
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+# Defaults; model_registry.json entries of type "fer" extend/override these
+# (path, backend, calibration_dir, ...). FER_BACKEND overrides every entry's backend.
 MODEL_PATHS = { "face_emotion": "Backend/fer13_mnetv2_binary.pt" }
 
+# Request coalescing: concurrent frames are stacked into one forward pass.
+BATCH_MAX_SIZE = int(os.environ.get("FER_BATCH_MAX_SIZE", 32))
+BATCH_MAX_WAIT_MS = float(os.environ.get("FER_BATCH_MAX_WAIT_MS", 10))
+BATCH_MAX_QUEUE = int(os.environ.get("FER_BATCH_MAX_QUEUE", 256))
+
+# Per-session smoothing (same defaults as prev_file/live_fer13_eyes.py)
+SMOOTHING = {"ema_alpha": 0.9, "temp": 1.0, "on_thresh": 0.65, "off_thresh": 0.45, "min_hold": 0.8}
+SESSION_TTL_S = float(os.environ.get("FER_SESSION_TTL_S", 300))
+SESSION_MAX = int(os.environ.get("FER_SESSION_MAX", 10000))
+# While a session's state is stable, frames arriving within this interval of the
+# last inference are answered from state without running the model.
+STABLE_AFTER_S = 3.0
+STABLE_MARGIN = 0.1
+MAX_SKIP_INTERVAL_S = 2.0
+
+# Optional face localization: crop to the largest face before classifying.
+# Detection runs on a FACE_DETECT_WIDTH-wide copy; the box is cached per session
+# and only re-detected every FACE_REDETECT_EVERY frames or on tracking loss.
+FACE_CROP = os.environ.get("FER_FACE_CROP", "0") == "1"
+FACE_DETECT_WIDTH = int(os.environ.get("FER_FACE_DETECT_WIDTH", 160))
+FACE_REDETECT_EVERY = int(os.environ.get("FER_FACE_REDETECT_EVERY", 5))
+FACE_DECODE_SIZE = (480, 360)
+FACE_LOCALIZER = None
+
+# Optional MediaPipe eye-closure override (per session only). Landmarks run every
+# FER_EYE_EVERY_N frames; after FER_EYE_CONSEC closed checks the engagement
+# score is forced down, as in prev_file/live_fer13_eyes.py.
+EYE_OVERRIDE = os.environ.get("FER_EYE_OVERRIDE", "0") == "1"
+EYE_THRESH = float(os.environ.get("FER_EYE_THRESH", 0.22))
+EYE_CONSEC = int(os.environ.get("FER_EYE_CONSEC", 3))
+EYE_EVERY_N = int(os.environ.get("FER_EYE_EVERY_N", 3))
+EYES_CLOSED_PROBS = [0.98, 0.02]
+EYE_CHECKER = None
+
+def new_session():
+    return FerSession(
+        EngagementSmoother(**SMOOTHING),
+        FaceTrack() if FACE_LOCALIZER is not None else None,
+        EyeState() if EYE_CHECKER is not None else None,
+    )
+
+SESSIONS = SessionStore(new_session, ttl=SESSION_TTL_S, max_sessions=SESSION_MAX)
+
+# Classroom-camera mode: one wide frame -> every face, one forward pass.
+# Faces are small in a wide shot, so detection runs at a higher resolution.
+CLASSROOM_DETECT_WIDTH = int(os.environ.get("FER_CLASSROOM_DETECT_WIDTH", 640))
+CLASSROOM_DECODE_SIZE = (1280, 720)
+CLASSROOM_MAX_FACES = 64
+CLASSROOM_LOCALIZER = None
+CAMERAS = SessionStore(MultiFaceTracker, ttl=SESSION_TTL_S, max_sessions=1000)
+
 # Model Definition (Kept here for module self-containment)
 class TinyImgClassifier(nn.Module):
     def __init__(self, num_classes=2, embed_dim=1280, pretrained=True):
@@ -33,6 +98,7 @@ class TinyImgClassifier(nn.Module):
     def forward(self, x):
         f = self.backbone(x); f = self.pool(f).flatten(1); return self.head(f)
 
+# Reference PIL pipeline; the served path uses fer_preprocess (see bench_preprocess.py).
 TRANSFORM = transforms.Compose([
     transforms.Grayscale(num_output_channels=3),   
     transforms.Resize((224, 224)),
@@ -40,48 +106,317 @@ TRANSFORM = transforms.Compose([
     transforms.Normalize([0.5, 0.5, 0.5], [0.5, 0.5, 0.5])
 ])
 
-def load_fer_models():
-    """Loads FER models during application startup."""
-    for name, path in MODEL_PATHS.items():
-        try:
-            model = TinyImgClassifier(num_classes=2, pretrained=False) 
-            state_dict = torch.load(path, map_location=DEVICE) 
-            model.load_state_dict(state_dict)
-            model.to(DEVICE)
-            model.eval()
-            MODELS[name] = model
-            print(f"✅ FER Router: Loaded model '{name}' on {DEVICE}")
-        except Exception as e:
-            print(f"❌ FER Router: Failed to load {name}: {e}")
-            MODELS[name] = None 
+def load_calibration_batches(calibration_dir, batch_size=8, limit=64):
+    """Preprocessed sample frames used for int8 calibration and parity checks."""
+    if not calibration_dir:
+        return []
+    paths = sorted(glob.glob(os.path.join(calibration_dir, "*.jp*g")) + glob.glob(os.path.join(calibration_dir, "*.png")))[:limit]
+    tensors = []
+    for p in paths:
+        with open(p, "rb") as f:
+            tensors.append(gray_to_tensor(preprocess_image(f.read())))
+    return [torch.stack(tensors[i:i + batch_size]) for i in range(0, len(tensors), batch_size)]
+
+def load_face_localizer():
+    global FACE_LOCALIZER
+    if not FACE_CROP:
+        return None
+    try:
+        FACE_LOCALIZER = FaceLocalizer(detect_width=FACE_DETECT_WIDTH, redetect_every=FACE_REDETECT_EVERY)
+        print(f"✅ FER Router: Face localization enabled (detect_width={FACE_DETECT_WIDTH}, redetect_every={FACE_REDETECT_EVERY})")
+    except Exception as e:
+        print(f"❌ FER Router: Face localization disabled: {e}")
+        FACE_LOCALIZER = None
+    return FACE_LOCALIZER
+
+def load_eye_checker():
+    global EYE_CHECKER
+    if not EYE_OVERRIDE:
+        return None
+    try:
+        EYE_CHECKER = EyeOpenness(eye_open_thresh=EYE_THRESH, consec_needed=EYE_CONSEC, every_n=EYE_EVERY_N)
+        print(f"✅ FER Router: Eye-closure override enabled (every_n={EYE_EVERY_N})")
+    except Exception as e:
+        print(f"❌ FER Router: MediaPipe not available ({e}). Eye override disabled.")
+        EYE_CHECKER = None
+    return EYE_CHECKER
+
+def get_classroom_localizer():
+    global CLASSROOM_LOCALIZER
+    if CLASSROOM_LOCALIZER is None:
+        CLASSROOM_LOCALIZER = FaceLocalizer(detect_width=CLASSROOM_DETECT_WIDTH, min_face=20)
+    return CLASSROOM_LOCALIZER
+
+def load_fer_model(name, config):
+    """Registry loader: eager TinyImgClassifier wrapped in the configured backend."""
+    path = config["path"]
+    model = TinyImgClassifier(num_classes=2, pretrained=False) 
+    state_dict = torch.load(path, map_location=DEVICE, weights_only=True)  # tensors only, no arbitrary pickles
+    model.load_state_dict(state_dict)
+    model.to(DEVICE)
+    model.eval()
+
+    backend = os.environ.get("FER_BACKEND", config.get("backend", "eager"))
+    served, parity = model, None
+    if backend != "eager":
+        calibration = load_calibration_batches(config.get("calibration_dir"))
+        served = build_backend(model, backend, DEVICE, weights_path=path, calibration_batches=calibration)
+        parity_inputs = torch.cat(calibration) if calibration else torch.randn(16, 3, 224, 224)
+        parity = check_parity(model, served, parity_inputs.to(DEVICE))
+        if parity["label_agreement"] < config.get("parity_min_agreement", 0.98):
+            print(f"❌ FER Router: '{backend}' failed parity for '{name}' ({parity}); falling back to eager.")
+            served, backend = model, "eager"
+
+    BACKEND_INFO[name] = {"backend": backend, "parity": parity}
+    print(f"✅ FER Router: Loaded model '{name}' on {DEVICE} (backend={backend}, parity={parity})")
+    return served
+
+def install_fer_model(name, served):
+    """Registry install hook: publishes a (new) model version to the batcher."""
+    MODELS[name] = served
+    if name in BATCHERS:
+        BATCHERS[name].model = served  # hot swap: the next batch uses the new version
+    else:
+        forward = get_executor("fer_forward")
+        BATCHERS[name] = MicroBatcher(
+            served, DEVICE, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS,
+            max_queue=BATCH_MAX_QUEUE, executor=forward, workers=forward.max_workers,
+            collate_fn=BatchBuffer(BATCH_MAX_SIZE, INPUT_SIZE).collate,
+        )
+
+REGISTRY.register_loader(
+    "fer", load_fer_model, install_fer_model,
+    defaults={name: ({"path": v} if isinstance(v, str) else dict(v)) for name, v in MODEL_PATHS.items()},
+    override_keys=("backend", "parity_min_agreement"),
+    path_keys=("path", "calibration_dir"),
+)
+
+def load_fer_stages():
+    """Optional pre-classifier stages (face crop, eye override)."""
+    load_face_localizer()
+    load_eye_checker()
+
+async def resolve_fer_model(model_name):
+    """The served model for `model_name`, loading lazy registry entries on first use."""
+    if MODELS.get(model_name) is None:
+        entry = REGISTRY.entries.get(model_name)
+        if entry is not None and entry.kind == "fer" and entry.status == "pending":
+            await asyncio.get_running_loop().run_in_executor(None, REGISTRY.get, model_name)
+    return MODELS.get(model_name)
+
+async def close_fer_batchers():
+    """Stops the background batching tasks on shutdown."""
+    for batcher in BATCHERS.values():
+        await batcher.close()
+
+def preprocess_image(image_bytes, face_track=None, eye_state=None):
+    """Fast path: scaled grayscale JPEG decode to a uint8 (224, 224) frame,
+    cropped to the face when localization is enabled (whole frame if no face).
+    Normalization happens per batch in BatchBuffer.collate. With an eye_state,
+    the eye-closure check runs on the same (cropped) frame and updates it."""
+    if FACE_LOCALIZER is None:
+        frame = decode_gray(image_bytes, INPUT_SIZE)
+    else:
+        gray = decode_gray_frame(image_bytes, FACE_DECODE_SIZE)
+        box = FACE_LOCALIZER.locate(gray, face_track)
+        if box is None:
+            box = (0, 0, gray.shape[1], gray.shape[0])
+        frame = FACE_LOCALIZER.crop(gray, box, INPUT_SIZE)
+    if eye_state is not None and EYE_CHECKER is not None:
+        EYE_CHECKER.update(frame, eye_state)
+    return frame
+
+def session_prediction(smoother, session_id, raw_probs=None, skipped=False, eyes_closed=None):
+    probs = smoother.probs_shown
+    return Prediction(
+        probs=probs.tolist(),
+        label=smoother.label,
+        confidence=float(probs[1]),
+        timestamp=time.time(),
+        session_id=session_id,
+        raw_probs=None if raw_probs is None else raw_probs.tolist(),
+        skipped=skipped,
+        eyes_closed=eyes_closed,
+    )
+
+async def infer_frame(model_name, image_bytes, session_id=None):
+    """Shared decode -> batched forward -> Prediction path for HTTP and WebSocket."""
+    smoother, face_track, eye_state = None, None, None
+    if session_id:
+        session = SESSIONS.get((model_name, session_id))
+        smoother, face_track, eye_state = session.smoother, session.face_track, session.eye_state
+        eyes_closed = eye_state.override if eye_state is not None else None
+        if smoother.should_skip(time.time(), STABLE_AFTER_S, STABLE_MARGIN, MAX_SKIP_INTERVAL_S):
+            smoother.skipped += 1
+            return session_prediction(smoother, session_id, skipped=True, eyes_closed=eyes_closed)
+
+    frame = await run_inference("fer", preprocess_image, image_bytes, face_track, eye_state)
+
+    logits = await BATCHERS[model_name].submit(frame)
+
+    if smoother is not None:
+        eyes_closed = eye_state.override if eye_state is not None else None
+        raw_probs, _ = smoother.update(logits, override_probs=EYES_CLOSED_PROBS if eyes_closed else None)
+        return session_prediction(smoother, session_id, raw_probs=raw_probs, eyes_closed=eyes_closed)
+
+    probs = softmax_np(logits)
+    label = "engaged" if probs[1] >= 0.5 else "not_engaged"
+    confidence_score = float(probs[1]) 
+
+    return Prediction(
+        probs=probs.tolist(),
+        label=label,
+        confidence=confidence_score,
+        timestamp=time.time(),
+    )
 
 # --- Prediction Route ---
 @router.post("/{model_name}", response_model=Prediction)
-async def predict(model_name: str, file: UploadFile = File(...)):
-    if model_name not in MODELS or MODELS[model_name] is None:
+async def predict(model_name: str, file: UploadFile = File(...), session_id: Optional[str] = None):
+    if await resolve_fer_model(model_name) is None:
         raise HTTPException(status_code=404, detail=f"Model '{model_name}' not found or failed to load.")
 
-    model = MODELS[model_name]
-
     try:
         image_bytes = await file.read()
-        image_pil = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        img_t = TRANSFORM(image_pil).unsqueeze(0).to(DEVICE)
+        return await infer_frame(model_name, image_bytes, session_id)
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+    except Exception as e:
+        print(f"Prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction failed due to an internal error: {e}")
 
-        with torch.no_grad():
-            output = model(img_t)
-            probs = torch.softmax(output, dim=1).cpu().numpy()[0]
+# --- Streaming Route ---
+@router.websocket("/{model_name}/stream")
+async def predict_stream(websocket: WebSocket, model_name: str, session_id: Optional[str] = None):
+    """
+    Accepts a continuous stream of binary JPEG frames and pushes back one JSON
+    prediction per processed frame. Only the newest frame is kept: if the client
+    sends faster than we can infer, older pending frames are dropped.
+    """
+    if await resolve_fer_model(model_name) is None:
+        await websocket.close(code=1008, reason=f"Model '{model_name}' not found or failed to load.")
+        return
+    await websocket.accept()
 
-        label = "engaged" if probs[1] >= 0.5 else "not_engaged"
-        confidence_score = float(probs[1]) 
+    slot = {"frame": None, "seq": 0, "received": 0, "dropped": 0, "closed": False}
+    frame_ready = asyncio.Event()
 
-        return Prediction(
-            probs=probs.tolist(),
-            label=label,
-            confidence=confidence_score,
-            timestamp=time.time(),
-        )
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                data = message.get("bytes")
+                if not data:
+                    continue  # text messages are ignored (keep-alives)
+                slot["received"] += 1
+                if slot["frame"] is not None:
+                    slot["dropped"] += 1
+                slot["frame"], slot["seq"] = data, slot["received"]
+                frame_ready.set()
+        finally:
+            slot["closed"] = True
+            frame_ready.set()
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            await frame_ready.wait()
+            frame_ready.clear()
+            if slot["closed"]:
+                break
+            frame, seq = slot["frame"], slot["seq"]
+            slot["frame"] = None
+            if frame is None:
+                continue
+            try:
+                pred = await infer_frame(model_name, frame, session_id)
+            except (ExecutorSaturated, HTTPException) as e:
+                slot["dropped"] += 1
+                await websocket.send_json({"error": getattr(e, "detail", str(e)), "frame_seq": seq, "retry_after": RETRY_AFTER_SECONDS})
+                continue
+            except Exception as e:
+                print(f"Stream prediction error ({session_id}): {e}")
+                await websocket.send_json({"error": f"Prediction failed: {e}", "frame_seq": seq})
+                continue
+            await websocket.send_json(StreamPrediction(
+                **pred.dict(),
+                frame_seq=seq,
+                frames_received=slot["received"],
+                frames_dropped=slot["dropped"],
+            ).dict())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+
+# --- Classroom Camera Route ---
+def classroom_faces(image_bytes):
+    """Decode and detect every face -> (boxes, crops). Boxes are returned in upload
+    pixels, even when draft mode decoded a smaller frame; crops come from the decoded frame."""
+    localizer = get_classroom_localizer()
+    gray, (sx, sy) = decode_gray_frame(image_bytes, CLASSROOM_DECODE_SIZE, with_scale=True)
+    small, scale = localizer.downscale(gray)
+    boxes = [tuple(v / scale for v in b) for b in localizer.detect_all(small)]
+    boxes = sorted(boxes, key=lambda b: b[2] * b[3], reverse=True)[:CLASSROOM_MAX_FACES]
+    crops = [localizer.crop(gray, box, INPUT_SIZE) for box in boxes]
+    return [(bx * sx, by * sy, bw * sx, bh * sy) for bx, by, bw, bh in boxes], crops
+
+@router.post("/{model_name}/classroom", response_model=ClassroomPrediction)
+async def predict_classroom(model_name: str, file: UploadFile = File(...), camera_id: Optional[str] = None):
+    """
+    One frame from a wide classroom camera -> one prediction per detected face,
+    with boxes and track ids that stay stable across frames for the same camera_id.
+    """
+    if await resolve_fer_model(model_name) is None:
+        raise HTTPException(status_code=404, detail=f"Model '{model_name}' not found or failed to load.")
+    try:
+        get_classroom_localizer()
     except Exception as e:
-        print(f"Prediction error: {e}")
+        raise HTTPException(status_code=503, detail=f"Face detection unavailable: {e}")
+
+    try:
+        image_bytes = await file.read()
+        boxes, crops = await run_inference("fer", classroom_faces, image_bytes)
+        # Crops share batches (and the queue bound) with single-frame traffic.
+        logits = await BATCHERS[model_name].submit_many(crops) if crops else []
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+    except Exception as e:
+        print(f"Classroom prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Prediction failed due to an internal error: {e}")
+
+    track_ids = CAMERAS.get(camera_id).update(boxes) if camera_id else list(range(1, len(boxes) + 1))
+    faces = []
+    for track_id, box, row in zip(track_ids, boxes, logits):
+        probs = softmax_np(row)
+        faces.append(FacePrediction(
+            track_id=track_id,
+            box=[int(round(v)) for v in box],
+            probs=probs.tolist(),
+            label="engaged" if probs[1] >= 0.5 else "not_engaged",
+            confidence=float(probs[1]),
+        ))
+    return ClassroomPrediction(camera_id=camera_id, num_faces=len(faces), faces=faces, timestamp=time.time())
+
+@router.get("/{model_name}/stats")
+def batching_stats(model_name: str):
+    """Batch-size and queue-wait statistics for tuning the micro-batcher."""
+    if model_name not in BATCHERS:
+        raise HTTPException(status_code=404, detail=f"Model '{model_name}' not found or failed to load.")
+    batcher = BATCHERS[model_name]
+    return {
+        **BACKEND_INFO.get(model_name, {}),
+        "max_batch_size": batcher.max_batch_size,
+        "max_wait_ms": batcher.max_wait * 1000.0,
+        **batcher.stats.snapshot(),
+        "session_store": SESSIONS.stats(),
+        "face_localizer": FACE_LOCALIZER.stats() if FACE_LOCALIZER is not None else None,
+        "eye_override": EYE_CHECKER.stats() if EYE_CHECKER is not None else None,
+    }
 # --- END OF FILE fer_router.py ---
\ No newline at end of file
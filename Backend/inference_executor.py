@@ -0,0 +1,117 @@
+# --- START OF FILE inference_executor.py ---
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a lane already has `max_pending` jobs queued or running."""
+
+
+class InferenceExecutor:
+    """
+    Bounded thread pool for blocking model work (torch, Whisper, sklearn).
+
+    Torch and tokenizers release the GIL during heavy ops, so threads are enough
+    to keep the event loop free. `max_pending` bounds queued + running jobs; once
+    reached, `run` fails fast with ExecutorSaturated instead of queueing forever.
+    """
+
+    def __init__(self, name, max_workers, max_pending):
+        self.name = name
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(self.max_workers, int(max_pending))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"infer-{name}")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs `fn(*args, **kwargs)` on the pool and awaits its result."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise ExecutorSaturated(f"Inference lane '{self.name}' is saturated ({self._pending} pending).")
+            self._pending += 1
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# --- Lanes ---
+# Separate lanes keep a long Whisper job from starving frame predictions.
+# Each lane is configurable via INFERENCE_<LANE>_WORKERS / INFERENCE_<LANE>_MAX_PENDING.
+# "fer" is per-frame decoding (admission control for frames); "fer_forward" only
+# receives batched model forwards from the FER batchers' consumers (a few per
+# model), so it never queues behind decodes and its limit is not hit in practice.
+LANE_DEFAULTS = {
+    "fer": (2, 64),
+    "fer_forward": (1, 16),
+    "asr": (1, 8),
+    "analysis": (2, 8),
+}
+EXECUTORS = {}
+RETRY_AFTER_SECONDS = 1
+
+
+def get_executor(lane):
+    if lane not in EXECUTORS:
+        workers, pending = LANE_DEFAULTS[lane]
+        prefix = f"INFERENCE_{lane.upper()}"
+        EXECUTORS[lane] = InferenceExecutor(
+            lane,
+            int(os.environ.get(f"{prefix}_WORKERS", workers)),
+            int(os.environ.get(f"{prefix}_MAX_PENDING", pending)),
+        )
+    return EXECUTORS[lane]
+
+
+async def run_inference(lane, fn, *args, **kwargs):
+    """Submits blocking work to a lane, mapping saturation to HTTP 503."""
+    try:
+        return await get_executor(lane).run(fn, *args, **kwargs)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+
+def executor_stats():
+    return {lane: executor.stats() for lane, executor in EXECUTORS.items()}
+
+
+def shutdown_executors():
+    for executor in EXECUTORS.values():
+        executor.shutdown()
+    EXECUTORS.clear()
+# --- END OF FILE inference_executor.py ---
@@ -0,0 +1,96 @@
+# --- START OF FILE keyword_extraction.py ---
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+import multiprocessing
+
+import yake
+
+# Kept free of torch/transformers imports: pool workers are spawned and import only this module.
+KEYWORD_WORKERS = int(os.environ.get("KEYWORD_WORKERS", min(4, os.cpu_count() or 1)))
+KEYWORD_PARALLEL_MIN_CHUNKS = int(os.environ.get("KEYWORD_PARALLEL_MIN_CHUNKS", 8))  # fewer chunks run serially
+DEFAULT_TOP_N = 10
+
+POOL = None
+POOL_LOCK = threading.Lock()
+_EXTRACTORS = {}  # per process: top_n -> yake.KeywordExtractor
+
+
+def _get_extractor(top_n):
+    extractor = _EXTRACTORS.get(top_n)
+    if extractor is None:
+        extractor = _EXTRACTORS[top_n] = yake.KeywordExtractor(top=top_n, stopwords=None)
+    return extractor
+
+
+def _init_worker(top_n=DEFAULT_TOP_N):
+    """Pool initializer: builds the extractor once per worker process."""
+    _get_extractor(top_n)
+
+
+def keywords_for(text, top_n=DEFAULT_TOP_N):
+    return [kw for kw, score in _get_extractor(top_n).extract_keywords(text)]
+
+
+def get_keyword_pool(workers=None):
+    global POOL
+    with POOL_LOCK:
+        if POOL is None:
+            POOL = ProcessPoolExecutor(
+                max_workers=workers or KEYWORD_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),  # no fork of a process holding torch threads
+                initializer=_init_worker,
+            )
+        return POOL
+
+
+def warm_keyword_pool(timeout=120):
+    """
+    Spawns every worker at startup, so the first long lecture does not pay for
+    spawning them. The pool starts processes on demand, so one warm-up task per
+    worker is submitted back to back (none can be idle yet) and awaited.
+    """
+    if KEYWORD_WORKERS <= 1:
+        return
+    pool = get_keyword_pool()
+    try:
+        for future in [pool.submit(_init_worker) for _ in range(KEYWORD_WORKERS)]:
+            future.result(timeout=timeout)
+    except Exception as e:
+        print(f"WARN: keyword pool warm-up failed ({e}); it will start on first use.")
+        shutdown_keyword_pool()
+
+
+def shutdown_keyword_pool():
+    global POOL
+    with POOL_LOCK:
+        if POOL is not None:
+            POOL.shutdown(wait=False, cancel_futures=True)
+            POOL = None
+
+
+def extract_keywords_batch(texts, top_n=DEFAULT_TOP_N, workers=None, min_parallel=None):
+    """
+    YAKE keywords for each text, in input order. Fans out over a process pool
+    when there are at least `min_parallel` texts and more than one worker;
+    otherwise (or if the pool died) runs serially in this process.
+    """
+    texts = list(texts)
+    workers = KEYWORD_WORKERS if workers is None else workers
+    min_parallel = KEYWORD_PARALLEL_MIN_CHUNKS if min_parallel is None else min_parallel
+    if workers <= 1 or len(texts) < max(2, min_parallel):
+        return [keywords_for(text, top_n) for text in texts]
+    chunksize = max(1, len(texts) // (workers * 4))
+    try:
+        return list(get_keyword_pool(workers).map(keywords_for, texts, repeat(top_n), chunksize=chunksize))
+    except BrokenProcessPool as e:
+        print(f"WARN: keyword pool failed ({e}); extracting serially.")
+        shutdown_keyword_pool()
+        return [keywords_for(text, top_n) for text in texts]
+
+
+def keyword_stats():
+    return {"workers": KEYWORD_WORKERS, "parallel_min_chunks": KEYWORD_PARALLEL_MIN_CHUNKS, "pool_started": POOL is not None}
+# --- END OF FILE keyword_extraction.py ---
@@ -1,17 +1,24 @@
 # --- START OF FILE lecture_analysis_router.py ---
+import hashlib
 import os
 import re
-import json
+import threading
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
-from datetime import timedelta
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
-import yake
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
 
 # Assuming models.py is in the same directory
 from .models import LectureAnalysisResponse, FlaggedChunk 
+from .inference_executor import run_inference
+from .embedding_service import encode, encode_cached, EMBEDDER_REGISTRY_NAME
+from .model_registry import REGISTRY
+from .transcript_store import STORE
+from .doubt_dedup import prepare_doubts
+from .keyword_extraction import extract_keywords_batch
+from .doubt_mapping import map_to_chunks
 
 router = APIRouter(
     prefix="/teacher",
@@ -19,21 +26,10 @@ router = APIRouter(
 )
 
 # --- CONFIGURATION & GLOBALS ---
-SENTENCE_MODEL = None
-DOUBT_TRANSCRIPT_PATH = "Backend/doubt_transcripts.json" # Path to student doubts
 THRESHOLD_DOUBT_COUNT = 2 # Flag if a chunk has 2 or more mapped doubts
 THRESHOLD_AVG_SIMILARITY = 0.65 # Flag if average similarity is > 65%
-
-def load_sentence_model():
-    """Loads the sentence transformer model once."""
-    global SENTENCE_MODEL
-    if SENTENCE_MODEL is None:
-        try:
-            SENTENCE_MODEL = SentenceTransformer('all-MiniLM-L6-v2')
-        except Exception as e:
-            print(f"FAILED to load SentenceTransformer in lecture_analysis: {e}")
-            raise
-    return SENTENCE_MODEL
+LECTURE_CACHE_MAX = int(os.environ.get("LECTURE_CACHE_MAX", 16))       # lecture transcripts kept per worker
+LECTURE_SCOPES_MAX = int(os.environ.get("LECTURE_SCOPES_MAX", 16))     # doubt filter scopes kept per lecture
 
 # ======================
 # CORE ANALYSIS FUNCTIONS (Adapted from teacher_side.py)
@@ -103,127 +99,165 @@ def chunk_transcript(data, chunk_size):
     return chunks
 
 def extract_keywords(chunks, top_n=10):
-    """Extract keywords using YAKE and add them to the chunk dictionary."""
-    kw_extractor = yake.KeywordExtractor(top=top_n, stopwords=None)
-    for chunk in chunks:
-        keywords = kw_extractor.extract_keywords(chunk["text"])
-        chunk["keywords"] = [kw for kw, score in keywords]
+    """Extract keywords using YAKE (over the keyword process pool for long lectures) and add them to the chunk dictionary."""
+    keywords = extract_keywords_batch([chunk["text"] for chunk in chunks], top_n=top_n)
+    for chunk, chunk_keywords in zip(chunks, keywords):
+        chunk["keywords"] = chunk_keywords
     return chunks
 
-def load_doubts(path):
-    """Load student doubts from the collected JSON file."""
-    if not os.path.exists(path) or os.path.getsize(path) == 0:
-        return []
-        
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-        # Assuming the data is an array of objects with a 'text' key
-        doubts = [d["text"] for d in data if isinstance(d, dict) and "text" in d]
-        return doubts
-
-def map_and_summarize(chunks, doubts):
-    """Map doubts to chunks, summarize, and apply flagging thresholds."""
-    if not doubts or len(doubts) < 2:
-        return [] # Not enough data to map/summarize
-
-    model = load_sentence_model()
-
-    chunk_texts = [" ".join(c["keywords"]) for c in chunks] # Compare doubt against keywords
-    
-    # Preprocessing for doubts (simple cleanup)
-    def preprocess_doubt(text):
-        return re.sub(r'[^a-zA-Z0-9\s]', '', text.lower())
-
-    doubts_clean = [preprocess_doubt(d) for d in doubts]
-    
-    chunk_embeddings = model.encode(chunk_texts, show_progress_bar=False)
-    doubt_embeddings = model.encode(doubts_clean, show_progress_bar=False)
+def preprocess_doubt(text):
+    """Simple cleanup before embedding a doubt."""
+    return re.sub(r'[^a-zA-Z0-9\s]', '', text.lower())
 
-    # Calculate Cosine Similarity
-    similarity_matrix = cosine_similarity(doubt_embeddings, chunk_embeddings)
+def chunk_texts(chunks):
+    return [" ".join(c["keywords"]) for c in chunks] # Compare doubt against keywords
 
-    # Summarization
-    summary = {}
-    
-    # Initialize summary structure with all chunks
-    for chunk in chunks:
-        summary[chunk["chunk_id"]] = {
-            "chunk_id": chunk["chunk_id"],
-            "start_time": chunk["start_time"],
-            "end_time": chunk["end_time"],
-            "keywords": chunk["keywords"],
-            "num_doubts": 0,
-            "total_similarity": 0.0,
-            "avg_similarity": 0.0
-        }
-    
-    # Map each doubt to the best chunk and aggregate scores
-    for i, doubt in enumerate(doubts):
-        sims = similarity_matrix[i]
-        best_idx = sims.argmax()
-        best_sim = sims[best_idx]
-        best_chunk_id = chunks[best_idx]["chunk_id"]
+def map_doubts(chunk_embeddings, doubts, top_k=None):
+    """Map each doubt to its best (or top-k) chunks -> (num_doubts, total_similarity) per chunk index."""
+    # Collapse repetition loops and merge near-duplicates; weights keep the original counts
+    unique_doubts, weights = prepare_doubts(doubts)
+    if not unique_doubts:
+        return map_to_chunks([], chunk_embeddings)
+    doubts_clean = [preprocess_doubt(d) for d in unique_doubts]
+    doubt_embeddings = encode_cached(doubts_clean)
 
-        summary[best_chunk_id]["num_doubts"] += 1
-        summary[best_chunk_id]["total_similarity"] += best_sim
+    # Cosine similarity on normalized embeddings in bounded blocks (ANN index for very large sets)
+    return map_to_chunks(doubt_embeddings, chunk_embeddings, weights, top_k=top_k)
 
-    # Final calculation and flagging
+def flag_chunks(chunks, num_doubts, total_similarity):
+    """Summarize the per-chunk aggregates and apply flagging thresholds."""
     flagged_chunks = []
-    for item in summary.values():
-        if item["num_doubts"] > 0:
-            item["avg_similarity"] = item["total_similarity"] / item["num_doubts"]
-        
+    for chunk, count, total in zip(chunks, num_doubts, total_similarity):
+        avg_similarity = total / count if count > 0 else 0.0
+
         # --- THRESHOLD LOGIC ---
-        if (item["num_doubts"] >= THRESHOLD_DOUBT_COUNT and item["avg_similarity"] >= THRESHOLD_AVG_SIMILARITY):
+        if (count >= THRESHOLD_DOUBT_COUNT and avg_similarity >= THRESHOLD_AVG_SIMILARITY):
             flagged_chunks.append(FlaggedChunk(
-                chunk_id=item["chunk_id"],
-                start_time=item["start_time"],
-                end_time=item["end_time"],
-                num_doubts=item["num_doubts"],
-                avg_similarity=round(item["avg_similarity"], 4),
-                keywords=item["keywords"]
+                chunk_id=chunk["chunk_id"],
+                start_time=chunk["start_time"],
+                end_time=chunk["end_time"],
+                num_doubts=int(count),
+                avg_similarity=round(float(avg_similarity), 4),
+                keywords=chunk["keywords"]
             ))
 
     return flagged_chunks
 
+# ======================
+# ARTIFACT CACHE (per transcript content hash)
+# ======================
+
+class LectureArtifacts:
+    """
+    Everything derived from one lecture transcript (chunks, YAKE keywords, chunk
+    embeddings), plus the doubt aggregates per filter scope. Each scope keeps a
+    store cursor, so a repeat analysis only embeds and maps doubts appended since.
+    """
+
+    def __init__(self, lecture_content):
+        transcript_data = parse_transcript_lines(lecture_content)
+        chunk_size = determine_chunk_size(transcript_data)
+        self.chunks = extract_keywords(chunk_transcript(transcript_data, chunk_size))
+        self.chunk_embeddings = encode(chunk_texts(self.chunks))
+        self.total_duration = str(timedelta(seconds=transcript_data[-1][0] - transcript_data[0][0]))
+        self.scopes = OrderedDict()  # filter key -> cursor + aggregates (LRU, at most LECTURE_SCOPES_MAX)
+        self.lock = threading.Lock()
+
+    def sync(self, store=None, **filters):
+        """Folds doubts stored since the last call into this scope -> (total, num_doubts, total_similarity)."""
+        key = tuple(sorted((k, v) for k, v in filters.items() if v is not None))
+        with self.lock:
+            scope = self.scopes.get(key)
+            if scope is None:
+                scope = {"cursor": 0, "total": 0,
+                         "num_doubts": np.zeros(len(self.chunks), dtype=np.int64),
+                         "total_similarity": np.zeros(len(self.chunks), dtype=np.float64)}
+                self.scopes[key] = scope
+                while len(self.scopes) > LECTURE_SCOPES_MAX:
+                    self.scopes.popitem(last=False)
+            self.scopes.move_to_end(key)
+
+            cursor, new_doubts = scope["cursor"], []
+            for row in (store or STORE).iter_doubts(after_id=cursor, **filters):
+                cursor = row["id"]
+                if row["text"]:
+                    new_doubts.append(row["text"])
+            if new_doubts:
+                # If encoding/mapping raises, the cursor stays put and the next call retries these doubts.
+                num_doubts, total_similarity = map_doubts(self.chunk_embeddings, new_doubts)
+                scope["num_doubts"] += num_doubts
+                scope["total_similarity"] += total_similarity
+                scope["total"] += len(new_doubts)
+            scope["cursor"] = cursor
+            return scope["total"], scope["num_doubts"].copy(), scope["total_similarity"].copy()
+
+
+LECTURE_CACHE = OrderedDict()  # (content hash, embedder version) -> LectureArtifacts (LRU)
+LECTURE_CACHE_LOCK = threading.Lock()
+
+def embedder_version():
+    entry = REGISTRY.entries.get(EMBEDDER_REGISTRY_NAME)
+    return (entry.config.get("model"), entry.config.get("precision"), entry.version) if entry is not None else None
+
+def get_lecture_artifacts(lecture_content: str):
+    """Cached artifacts for this transcript; built (parse, chunk, YAKE, encode) only on a miss."""
+    key = (hashlib.sha256(lecture_content.encode("utf-8")).hexdigest(), embedder_version())
+    with LECTURE_CACHE_LOCK:
+        artifacts = LECTURE_CACHE.get(key)
+        if artifacts is not None:
+            LECTURE_CACHE.move_to_end(key)
+            return artifacts
+    artifacts = LectureArtifacts(lecture_content)  # built outside the lock; a racing miss just builds twice
+    with LECTURE_CACHE_LOCK:
+        artifacts = LECTURE_CACHE.setdefault(key, artifacts)
+        LECTURE_CACHE.move_to_end(key)
+        while len(LECTURE_CACHE) > LECTURE_CACHE_MAX:
+            LECTURE_CACHE.popitem(last=False)
+    return artifacts
+
+
+def run_lecture_analysis(lecture_content: str, **filters):
+    """Blocking part of the lecture analysis (parsing, YAKE, embeddings); `filters` scope the doubts."""
+    # 1-3. Parse, chunk, extract keywords and embed chunks (cached by transcript content)
+    artifacts = get_lecture_artifacts(lecture_content)
+
+    # 4-5. Fold in student doubts stored since the last run, then summarize and flag
+    total_doubts, num_doubts, total_similarity = artifacts.sync(**filters)
+    if total_doubts < 2:
+        raise HTTPException(status_code=400, detail="Not enough unique student doubts collected for robust analysis. Need at least 2.")
+    flagged_chunks = flag_chunks(artifacts.chunks, num_doubts, total_similarity)
+
+    # 6. Final Response
+    return LectureAnalysisResponse(
+        total_lecture_duration=artifacts.total_duration,
+        flagged_chunks=flagged_chunks
+    )
+
 
 # ======================
 # API ROUTE
 # ======================
 @router.post("/analyze_lecture", response_model=LectureAnalysisResponse)
-async def analyze_lecture(lecture_transcript_file: UploadFile = File(..., description="Full lecture transcript with timestamps [HH:MM:SS]")):
+async def analyze_lecture(
+    lecture_transcript_file: UploadFile = File(..., description="Full lecture transcript with timestamps [HH:MM:SS]"),
+    class_id: Optional[str] = Query(None),
+    lecture_id: Optional[str] = Query(None, description="Only map doubts recorded for this lecture"),
+    session_id: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+):
     """
-    Analyzes the lecture transcript against all collected student doubts to find and flag 
-    the most confusing time segments.
+    Analyzes the lecture transcript against the collected student doubts (all of them,
+    or only those matching the optional filters) to find and flag the most confusing
+    time segments.
     """
     try:
-        # 1. Read and parse lecture transcript
         lecture_content = (await lecture_transcript_file.read()).decode('utf-8')
-        transcript_data = parse_transcript_lines(lecture_content)
-
-        # 2. Dynamic Chunking
-        chunk_size = determine_chunk_size(transcript_data)
-        chunks = chunk_transcript(transcript_data, chunk_size)
-
-        # 3. Keyword Extraction (YAKE)
-        chunks_with_keywords = extract_keywords(chunks)
-        
-        # 4. Load Student Doubts
-        doubts = load_doubts(DOUBT_TRANSCRIPT_PATH)
-        if not doubts or len(doubts) < 2:
-            raise HTTPException(status_code=400, detail="Not enough unique student doubts collected for robust analysis. Need at least 2.")
-
-        # 5. Mapping, Summarization, and Flagging
-        flagged_chunks = map_and_summarize(chunks_with_keywords, doubts)
-
-        # 6. Final Response
-        total_duration = str(timedelta(seconds=transcript_data[-1][0] - transcript_data[0][0]))
-        
-        return LectureAnalysisResponse(
-            total_lecture_duration=total_duration,
-            flagged_chunks=flagged_chunks
-        )
+        filters = dict(class_id=class_id, lecture_id=lecture_id, session_id=session_id, since=since, until=until)
+        return await run_inference("analysis", run_lecture_analysis, lecture_content, **filters)
 
+    except HTTPException:
+        raise
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=f"Transcript Parsing Error: {ve}")
     except Exception as e:
@@ -1,13 +1,18 @@
 # --- START OF FILE main.py (Final Clean Hub) ---
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 # --- Import ALL Routers and Loaders ---
-from .fer_router import router as fer_router, load_fer_models
-from .asr_router import router as asr_router, load_asr_model
-from .topic_analysis import router as topic_router, load_sentence_model 
+from .fer_router import router as fer_router, load_fer_stages, close_fer_batchers
+from .asr_router import router as asr_router, asr_stats, close_asr_batcher
+from .topic_analysis import router as topic_router, TOPIC_UPDATE_COUNTS
 from .lecture_analysis_router import router as lecture_router 
+from .model_registry import router as registry_router, REGISTRY
+from .inference_executor import executor_stats, shutdown_executors
+from .embedding_service import ENCODER, cache_stats
+from .keyword_extraction import keyword_stats, warm_keyword_pool, shutdown_keyword_pool
 
 # ---------------- Lifespan Event Handler ---------------- #
 @asynccontextmanager
@@ -17,16 +22,22 @@ async def lifespan(app: FastAPI):
     """
     print("--- STARTUP: Loading Multimodal Models ---")
     
-    # Load all models concurrently (or sequentially, if resources are tight)
-    load_fer_models()       # Load Facial Engagement Model (PyTorch)
-    load_asr_model()        # Load ASR/Translation Model (Whisper/HuggingFace)
-    load_sentence_model()   # Load Topic Analysis Embedder (SentenceTransformer)
+    # Every model in model_registry.json (FER, Whisper, SentenceTransformer) is
+    # loaded concurrently; set MODEL_LOAD_CONCURRENT=0 if resources are tight.
+    # Entries marked "lazy" load on first use instead.
+    load_fer_stages()       # Optional face crop / eye override stages
+    REGISTRY.load_all(concurrent=os.environ.get("MODEL_LOAD_CONCURRENT", "1") == "1")
+    warm_keyword_pool()     # YAKE process pool for long lectures
     
     print("--- STARTUP COMPLETE ---")
     
     yield # Application starts serving requests
 
     print("Application shutting down...")
+    await close_fer_batchers()
+    await close_asr_batcher()
+    shutdown_executors()
+    shutdown_keyword_pool()
 
 
 # ---------------- App Instantiation ---------------- #
@@ -37,6 +48,7 @@ app.include_router(fer_router)       # Routes: /predict/{model_name}
 app.include_router(asr_router)      # Routes: /asr/transcribe
 app.include_router(topic_router)    # Routes: /analyze/topics
 app.include_router(lecture_router)
+app.include_router(registry_router)  # Routes: /models, /models/{name}/reload
 
 # CORS configuration
 origins = [ "http://localhost:3000", "http://127.0.0.1:3000" ]
@@ -54,6 +66,12 @@ def health():
     return {
         "status": "ok",
         "message": "All routers loaded.",
-        "routes": ["/predict/{model_name}", "/asr/transcribe", "/analyze/topics"]
+        "routes": ["/predict/{model_name}", "/asr/transcribe", "/analyze/topics"],
+        "executors": executor_stats(),
+        "embedder": ENCODER.stats(),
+        "embedding_cache": cache_stats(),
+        "asr": asr_stats(),
+        "keywords": keyword_stats(),
+        "topic_updates": dict(TOPIC_UPDATE_COUNTS),
     }
 # --- END OF FILE main.py (Final Clean Hub) ---
\ No newline at end of file
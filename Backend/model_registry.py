@@ -0,0 +1,249 @@
+# --- START OF FILE model_registry.py ---
+import asyncio
+import hmac
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Body, Header, HTTPException
+
+router = APIRouter(
+    prefix="/models",
+    tags=["Model Registry"],
+)
+
+REGISTRY_PATH = "Backend/model_registry.json"
+# POST /models/{name}/reload is disabled unless this token is set; callers send it as X-Admin-Token.
+MODEL_ADMIN_TOKEN = os.environ.get("MODEL_ADMIN_TOKEN")
+# Reload overrides may only point at files/folders under this directory.
+MODEL_WEIGHTS_DIR = os.environ.get("MODEL_WEIGHTS_DIR", "Backend")
+
+
+def rss_mb():
+    """Resident set size of this process in MB (Linux /proc, else peak RSS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def param_mb(model):
+    """Parameter + buffer size of the torch module behind `model`, if any."""
+    import torch.nn as nn
+    module = model if isinstance(model, nn.Module) else getattr(model, "model", None)
+    if not isinstance(module, nn.Module):
+        return None
+    total = sum(t.numel() * t.element_size() for t in list(module.parameters()) + list(module.buffers()))
+    return round(total / 2**20, 2)
+
+
+class ModelEntry:
+    def __init__(self, name, config):
+        self.name = name
+        self.config = config
+        self.model = None
+        self.version = 0
+        self.status = "pending"   # pending | loading | ready | failed
+        self.error = None
+        self.load_time_s = None
+        self.param_mb = None
+        self.rss_delta_mb = None
+        self.lock = threading.Lock()
+
+    @property
+    def kind(self):
+        return self.config.get("type", "fer")
+
+    @property
+    def lazy(self):
+        return bool(self.config.get("lazy", False))
+
+    def info(self):
+        return {
+            "name": self.name,
+            "type": self.kind,
+            "status": self.status,
+            "version": self.version,
+            "lazy": self.lazy,
+            "load_time_s": self.load_time_s,
+            "param_mb": self.param_mb,
+            "rss_delta_mb": self.rss_delta_mb,
+            "error": self.error,
+            "config": self.config,
+        }
+
+
+class ModelRegistry:
+    """
+    Loads every model named in model_registry.json through a per-type loader.
+
+    Routers register `loader(name, config) -> model` and an optional
+    `install(name, model)` hook that publishes the model into their own globals.
+    Non-lazy entries are loaded concurrently at startup; lazy ones on first
+    `get`. `reload` builds a new version next to the old one and swaps it in
+    only once it loaded, so requests keep being served during a hot swap.
+    """
+
+    def __init__(self, path=REGISTRY_PATH):
+        self.path = path
+        self.loaders = {}
+        self.defaults = {}
+        self.override_keys = {}  # kind -> config keys a reload may override
+        self.path_keys = {}      # kind -> override keys holding a path (must stay under MODEL_WEIGHTS_DIR)
+        self.entries: Dict[str, ModelEntry] = {}
+        self.startup_s = None
+
+    def register_loader(self, kind, loader, install=None, defaults=None, override_keys=(), path_keys=()):
+        self.loaders[kind] = (loader, install)
+        self.override_keys[kind] = set(override_keys) | set(path_keys)
+        self.path_keys[kind] = set(path_keys)
+        for name, config in (defaults or {}).items():
+            self.defaults[name] = {"type": kind, **config}
+
+    def load_config(self):
+        configs = {name: dict(config) for name, config in self.defaults.items()}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for name, entry in json.load(f).items():
+                    configs.setdefault(name, {}).update({"path": entry} if isinstance(entry, str) else entry)
+        for name, config in configs.items():
+            if name in self.entries:
+                self.entries[name].config = config
+            else:
+                self.entries[name] = ModelEntry(name, config)
+        return configs
+
+    def _build(self, entry, config, measure_rss=True):
+        """Builds a model -> (model, load time, RSS delta). The RSS delta is process-wide,
+        so it is None when other models are loading at the same time."""
+        if entry.kind not in self.loaders:
+            raise KeyError(f"No loader registered for model type '{entry.kind}'.")
+        loader, _ = self.loaders[entry.kind]
+        rss0, t0 = rss_mb(), time.perf_counter()
+        model = loader(entry.name, config)
+        return model, time.perf_counter() - t0, (rss_mb() - rss0 if measure_rss else None)
+
+    def _install(self, entry, model, config, load_time, rss_delta):
+        _, install = self.loaders[entry.kind]
+        if install is not None:
+            install(entry.name, model)
+        entry.model, entry.config = model, config
+        entry.version += 1
+        entry.status, entry.error = "ready", None
+        entry.load_time_s = round(load_time, 3)
+        entry.param_mb = param_mb(model)
+        entry.rss_delta_mb = round(rss_delta, 1) if rss_delta is not None else None
+        print(f"✅ Registry: '{entry.name}' v{entry.version} ready in {entry.load_time_s}s ({entry.param_mb} MB params)")
+
+    def load(self, name, measure_rss=True):
+        entry = self.entries[name]
+        with entry.lock:
+            if entry.status == "ready":
+                return entry.model
+            entry.status = "loading"
+            try:
+                model, load_time, rss_delta = self._build(entry, entry.config, measure_rss)
+                self._install(entry, model, entry.config, load_time, rss_delta)
+                return entry.model
+            except Exception as e:
+                entry.status, entry.error = "failed", str(e)
+                print(f"❌ Registry: Failed to load '{name}': {e}")
+                return None
+
+    def load_all(self, concurrent=True):
+        """Loads all non-lazy entries (in parallel threads unless `concurrent` is False)."""
+        self.load_config()
+        names = [n for n, e in self.entries.items() if not e.lazy and e.kind in self.loaders]
+        t0 = time.perf_counter()
+        if concurrent and len(names) > 1:
+            with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="model-load") as pool:
+                list(pool.map(lambda n: self.load(n, measure_rss=False), names))
+        else:
+            for n in names:
+                self.load(n)
+        self.startup_s = round(time.perf_counter() - t0, 3)
+        print(f"--- Registry: {len(names)} model(s) loaded in {self.startup_s}s ({'concurrent' if concurrent else 'sequential'}) ---")
+        return self.startup_s
+
+    def get(self, name):
+        """The current model for `name`, loading it first if it is lazy/pending."""
+        if name not in self.entries:
+            self.load_config()
+        entry = self.entries.get(name)
+        if entry is None:
+            return None
+        if entry.status in ("pending", "loading"):
+            return self.load(name)
+        return entry.model  # None if it failed; use reload() to retry
+
+    def validate_overrides(self, entry, overrides):
+        """Only keys the loader allows; path keys must resolve under MODEL_WEIGHTS_DIR."""
+        allowed = self.override_keys.get(entry.kind, set())
+        rejected = sorted(set(overrides) - allowed)
+        if rejected:
+            raise ValueError(f"Override keys {rejected} are not allowed for '{entry.kind}' models (allowed: {sorted(allowed)}).")
+        root = os.path.realpath(MODEL_WEIGHTS_DIR)
+        for key in self.path_keys.get(entry.kind, ()):
+            value = overrides.get(key)
+            if value is None:
+                continue
+            if not isinstance(value, str) or os.path.commonpath([root, os.path.realpath(value)]) != root:
+                raise ValueError(f"Override '{key}' must be a path under {MODEL_WEIGHTS_DIR}.")
+
+    def reload(self, name, overrides=None):
+        """Hot-swaps `name` to a new version built from its config + `overrides`."""
+        entry = self.entries[name]
+        self.validate_overrides(entry, overrides or {})
+        config = {**entry.config, **(overrides or {})}
+        model, load_time, rss_delta = self._build(entry, config)  # old version keeps serving meanwhile
+        with entry.lock:
+            self._install(entry, model, config, load_time, rss_delta)
+        return entry.info()
+
+    def info(self):
+        return {
+            "startup_s": self.startup_s,
+            "rss_mb": round(rss_mb(), 1),
+            "models": [e.info() for e in self.entries.values()],
+        }
+
+
+REGISTRY = ModelRegistry()
+
+
+# --- Routes ---
+@router.get("")
+def list_models():
+    """Per-model status, version, load time and memory."""
+    return REGISTRY.info()
+
+@router.post("/{name}/reload")
+async def reload_model(
+    name: str,
+    overrides: Optional[Dict[str, Any]] = Body(default=None),
+    x_admin_token: Optional[str] = Header(default=None),
+):
+    """
+    Loads a new version of `name` (optionally with allowlisted config overrides
+    such as a new weights path under MODEL_WEIGHTS_DIR or a backend) and swaps it
+    in without restarting the worker. Requires the X-Admin-Token header.
+    """
+    if not MODEL_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Model reloads are disabled (MODEL_ADMIN_TOKEN is not set).")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, MODEL_ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token.")
+    if name not in REGISTRY.entries:
+        raise HTTPException(status_code=404, detail=f"Model '{name}' is not in the registry.")
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, REGISTRY.reload, name, overrides)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        print(f"Registry reload error for '{name}': {e}")
+        raise HTTPException(status_code=500, detail=f"Reload of '{name}' failed; previous version still serving: {e}")
+# --- END OF FILE model_registry.py ---
@@ -1,6 +1,6 @@
 # --- START OF FILE models.py ---
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import Any, List, Dict, Optional
 
 # Model for Facial Engagement Prediction
 class Prediction(BaseModel):
@@ -8,18 +8,59 @@ class Prediction(BaseModel):
     label: str
     confidence: float
     timestamp: float
+    # Set when a session_id is given: probs/label/confidence are then the
+    # EMA-smoothed, hysteresis-gated values and raw_probs is the frame's own output.
+    session_id: Optional[str] = None
+    raw_probs: Optional[List[float]] = None
+    skipped: bool = False
+    eyes_closed: Optional[bool] = None
+
+# Model for one frame pushed back over /predict/{model_name}/stream
+class StreamPrediction(Prediction):
+    frame_seq: int
+    frames_received: int
+    frames_dropped: int
+
+# Models for the multi-face classroom-camera endpoint
+class FacePrediction(BaseModel):
+    track_id: int
+    box: List[int] # [x, y, w, h] in frame pixels
+    probs: List[float]
+    label: str
+    confidence: float
+
+class ClassroomPrediction(BaseModel):
+    camera_id: Optional[str] = None
+    num_faces: int
+    faces: List[FacePrediction]
+    timestamp: float
 
 # Model for Topic Analysis Response
 class TopicAnalysisResponse(BaseModel):
     total_doubts: int
     topics: Dict[str, str]
     flagged_topics: List[str]
+    mode: Optional[str] = None  # "online" (maintained clusters) or "batch"
+    quality: Optional[Dict[str, Any]] = None  # k, silhouette, davies_bouldin, ...
 
 # Model for ASR/Transcription Response (The output of the speech router)
 class ASRResponse(BaseModel):
     language: str = "English"
     transcript: str
     is_translation: bool = True
+    # Voice-activity detection report (absent when ASR_VAD=0)
+    audio_seconds: Optional[float] = None
+    speech_seconds: Optional[float] = None
+    skipped_fraction: Optional[float] = None
+    segments: Optional[int] = None
+
+# Pushed over /asr/stream: "partial" updates while audio arrives, then one "final"
+class ASRStreamUpdate(BaseModel):
+    type: str
+    transcript: str
+    audio_seconds: float
+    doubt_id: Optional[int] = None  # set on the final message once it is stored
+    language: str = "English"
 
 # Model for the Teacher-Side Lecture Analysis Output
 class FlaggedChunk(BaseModel):
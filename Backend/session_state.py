@@ -0,0 +1,130 @@
+# --- START OF FILE session_state.py ---
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def softmax_np(z, temp=1.0):
+    z = np.asarray(z, dtype=np.float64) / max(temp, 1e-6)
+    z -= np.max(z)
+    e = np.exp(z)
+    return e / e.sum()
+
+def ema(prev, cur, a=0.9): return cur if prev is None else a*cur + (1-a)*prev
+
+
+class EngagementSmoother:
+    """
+    Server-side port of the EMA + hysteresis loop from prev_file/live_fer13_eyes.py.
+
+    `update` folds one frame's logits into the smoothed probabilities and flips
+    the ENGAGED / NOT ENGAGED state only when p_eng crosses `on_thresh` /
+    `off_thresh` and the current state has been held for `min_hold` seconds.
+    """
+
+    def __init__(self, ema_alpha=0.9, temp=1.0, on_thresh=0.65, off_thresh=0.45, min_hold=0.8):
+        self.ema_alpha = ema_alpha
+        self.temp = temp
+        self.on_thresh = on_thresh
+        self.off_thresh = off_thresh
+        self.min_hold = min_hold
+
+        self.probs_ema = None
+        self.probs_shown = None  # probs_ema, or the override when one is applied
+        self.state = 0  # 0=NOT ENGAGED, 1=ENGAGED
+        self.last_switch = time.time()
+        self.last_inference = 0.0
+        self.frames = 0
+        self.skipped = 0
+
+    def update(self, logits, now=None, override_probs=None):
+        """Returns (raw per-frame probs, shown probs). `override_probs` (e.g. the
+        eye-closure override) replaces the smoothed probs for hysteresis and output,
+        without resetting the EMA."""
+        now = time.time() if now is None else now
+        p = softmax_np(logits, temp=self.temp)
+        self.probs_ema = ema(self.probs_ema, p, a=self.ema_alpha)
+        self.probs_shown = self.probs_ema if override_probs is None else np.asarray(override_probs, dtype=np.float64)
+        p_eng = float(self.probs_shown[1])
+
+        if self.state == 0 and p_eng >= self.on_thresh and (now - self.last_switch) >= self.min_hold:
+            self.state = 1; self.last_switch = now
+        elif self.state == 1 and p_eng <= self.off_thresh and (now - self.last_switch) >= self.min_hold:
+            self.state = 0; self.last_switch = now
+
+        self.last_inference = now
+        self.frames += 1
+        return p, self.probs_shown
+
+    @property
+    def label(self):
+        return "engaged" if self.state == 1 else "not_engaged"
+
+    def is_stable(self, now, stable_after, margin):
+        """True when the state has been held a while and p_eng is clear of the switch threshold."""
+        if self.probs_shown is None or (now - self.last_switch) < stable_after:
+            return False
+        p_eng = float(self.probs_shown[1])
+        if self.state == 1:
+            return p_eng >= self.off_thresh + margin
+        return p_eng <= self.on_thresh - margin
+
+    def should_skip(self, now, stable_after, margin, max_skip_interval):
+        """Frames may be skipped while stable, but we still re-infer every `max_skip_interval` seconds."""
+        return self.is_stable(now, stable_after, margin) and (now - self.last_inference) < max_skip_interval
+
+
+class FerSession:
+    """Everything the FER path remembers about one student session."""
+
+    def __init__(self, smoother, face_track=None, eye_state=None):
+        self.smoother = smoother
+        self.face_track = face_track
+        self.eye_state = eye_state
+
+
+class SessionStore:
+    """
+    Per-session state keyed by session/student id.
+
+    Entries idle for longer than `ttl` seconds are evicted, and at most
+    `max_sessions` are kept (least recently used first out), so memory stays
+    bounded no matter how many ids clients send.
+    """
+
+    def __init__(self, factory, ttl=300.0, max_sessions=10000):
+        self.factory = factory
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._entries = OrderedDict()  # key -> (last_seen, state)
+        self.evicted = 0
+
+    def _evict(self, now):
+        while self._entries:
+            key, (last_seen, _) = next(iter(self._entries.items()))
+            if now - last_seen <= self.ttl and len(self._entries) <= self.max_sessions:
+                break
+            del self._entries[key]
+            self.evicted += 1
+
+    def get(self, key, now=None):
+        now = time.time() if now is None else now
+        entry = self._entries.pop(key, None)
+        if entry is None or now - entry[0] > self.ttl:
+            state = self.factory()
+        else:
+            state = entry[1]
+        self._entries[key] = (now, state)
+        self._evict(now)
+        return state
+
+    def discard(self, key):
+        self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {"sessions": len(self._entries), "max_sessions": self.max_sessions, "ttl_s": self.ttl, "evicted": self.evicted}
+# --- END OF FILE session_state.py ---
@@ -0,0 +1,71 @@
+# test_doubt_dedup.py
+# Run from the repo root:  python -m pytest Backend/tests
+
+from Backend.doubt_dedup import collapse_repetition, dedup_doubts, content_skeleton, jaccard, shingles, MIN_JACCARD
+
+
+def test_collapse_ignores_punctuation_and_case():
+    text = "I don't like gradient descent. I don't like gradient descent"
+    assert collapse_repetition(text) == "I don't like gradient descent."
+    assert collapse_repetition("What is a tensor? what is a tensor? WHAT IS A TENSOR") == "What is a tensor?"
+
+
+def test_collapse_long_loop_and_partial_tail():
+    loop = "I didn't get a degree in distance so " * 20 + "I didn't get a de"
+    assert collapse_repetition(loop) == "I didn't get a degree in distance so"
+
+
+def test_collapse_keeps_single_doubled_word_and_plain_text():
+    assert collapse_repetition("it is very very hard") == "it is very very hard"
+    assert collapse_repetition("why is the loss going up") == "why is the loss going up"
+    assert collapse_repetition("  hello ") == "hello"
+
+
+def test_dedup_merges_punctuation_and_case_variants():
+    uniques, weights, index = dedup_doubts(["What is a gradient?", "what is a gradient", "WHAT IS A GRADIENT!"])
+    assert uniques == ["What is a gradient?"]
+    assert weights == [3]
+    assert index == [0, 0, 0]
+
+
+def test_dedup_merges_one_word_edits_in_longer_doubts():
+    texts = [
+        "Why does the loss go up when the learning rate is too high?",
+        "why does loss go up when the learning rate is too high",
+        "can you explain backpropagation again",
+        "can you explain back propagation again",
+        "what is a gradient",
+        "what is a gradient please",
+    ]
+    uniques, weights, index = dedup_doubts(texts)
+    assert weights == [2, 2, 2]
+    assert index == [0, 0, 1, 1, 2, 2]
+
+
+def test_dedup_keeps_different_short_doubts_apart():
+    texts = ["what is a gradient", "what is a tensor", "why is the loss high", "why is the loss low",
+             "how does useState work", "how does useEffect work", "explain the chain rule", "explain the power rule"]
+    uniques, weights, _ = dedup_doubts(texts)
+    assert uniques == texts
+    assert weights == [1] * len(texts)
+
+
+def test_dedup_keeps_similar_doubts_about_different_things_apart():
+    # Both pairs clear the shingle Jaccard threshold; only a content word differs.
+    pairs = [("how does backpropagation work in cnn", "how does backpropagation work in rnn"),
+             ("what is the gradient", "what is the gradient of relu")]
+    for a, b in pairs:
+        assert jaccard(shingles(a), shingles(b)) >= MIN_JACCARD
+        uniques, weights, _ = dedup_doubts([a, b])
+        assert uniques == [a, b]
+        assert weights == [1, 1]
+
+
+def test_merges_need_threshold_and_only_filler_differences():
+    texts = ["what is the gradient of relu", "what is the gradient of the relu", "what is the gradient",
+             "why is the loss going up", "why is the loss not going up"]
+    uniques, _, index = dedup_doubts(texts)
+    assert index == [0, 0, 1, 2, 3]  # "not" is a content word
+    for i, j in enumerate(index):
+        assert jaccard(shingles(texts[i]), shingles(uniques[j])) >= MIN_JACCARD
+        assert content_skeleton(texts[i]) == content_skeleton(uniques[j])
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+import torch
+
+from Backend.fer_batcher import MicroBatcher
+from Backend.inference_executor import ExecutorSaturated
+
+
+def frames(n):
+    return [torch.full((1, 2, 2), float(i)) for i in range(n)]
+
+
+def test_submit_many_returns_rows_in_order_across_batches():
+    async def run():
+        batcher = MicroBatcher(torch.nn.Flatten(), "cpu", max_batch_size=4, max_wait_ms=1)
+        try:
+            rows = await batcher.submit_many(frames(10))
+        finally:
+            await batcher.close()
+        return rows, batcher.stats.snapshot()
+
+    rows, stats = asyncio.run(run())
+    assert [row[0] for row in rows] == list(range(10))
+    assert stats["batches"] >= 3 and max(stats["batch_size_histogram"]) <= 4
+
+
+def test_submit_many_is_rejected_whole_when_the_queue_is_full():
+    async def run():
+        batcher = MicroBatcher(torch.nn.Flatten(), "cpu", max_batch_size=2, max_queue=4)
+        try:
+            with pytest.raises(ExecutorSaturated):
+                await batcher.submit_many(frames(5))
+            assert batcher.pending() == 0
+        finally:
+            await batcher.close()
+
+    asyncio.run(run())
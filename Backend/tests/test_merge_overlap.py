@@ -0,0 +1,18 @@
+from Backend.asr_router import merge_overlap
+
+
+def test_drops_words_heard_in_both_windows():
+    assert merge_overlap("we talked about the derivative", "the derivative of x") == "we talked about the derivative of x"
+
+
+def test_overlap_match_ignores_case_and_punctuation():
+    assert merge_overlap("what is the limit.", "The limit of f") == "what is the limit. of f"
+
+
+def test_single_shared_word_is_not_treated_as_overlap():
+    assert merge_overlap("I think so", "so what is it") == "I think so so what is it"
+
+
+def test_empty_sides():
+    assert merge_overlap("", "hello there") == "hello there"
+    assert merge_overlap("hello there", "") == "hello there"
@@ -0,0 +1,45 @@
+import numpy as np
+
+from Backend.vad import VadResult, VadStats, detect_speech
+
+SR = 16000
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * SR)) / SR
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SR), dtype=np.float32)
+
+
+def test_chunks_leave_out_pauses_between_segments():
+    samples = np.concatenate([silence(1), tone(2), silence(3), tone(2), silence(1)])
+    vad = detect_speech(samples, SR)
+    assert len(vad.segments) == 2
+    clips = vad.chunks(samples, max_seconds=25.0)
+    assert len(clips) == 1
+    assert sum(len(c) for c in clips) == vad.speech_samples
+    assert vad.speech_samples < 5 * SR  # the 3 s pause is not sent
+
+
+def test_skipped_fraction_matches_samples_sent():
+    samples = np.concatenate([silence(1), tone(2), silence(3), tone(2), silence(1)])
+    vad = detect_speech(samples, SR)
+    sent = sum(len(c) for c in vad.chunks(samples))
+    assert abs(vad.summary()["skipped_fraction"] - (1 - sent / samples.size)) < 1e-3
+    stats = VadStats()
+    stats.record(vad)
+    assert abs(stats.stats()["skipped_fraction"] - (1 - sent / samples.size)) < 1e-3
+
+
+def test_chunks_respect_max_seconds():
+    samples = np.arange(40 * SR, dtype=np.float32)
+    vad = VadResult([(0, 12 * SR), (14 * SR, 26 * SR), (28 * SR, 40 * SR)], samples.size, SR)
+    clips = vad.chunks(samples, max_seconds=25.0)
+    assert [len(c) for c in clips] == [24 * SR, 12 * SR]
+    assert clips[0][12 * SR] == 14 * SR  # second segment follows the first directly
+
+    long = VadResult([(0, 60 * SR)], 60 * SR, SR)
+    assert [len(c) for c in long.chunks(np.zeros(60 * SR, np.float32), 25.0)] == [25 * SR, 25 * SR, 10 * SR]
@@ -1,14 +1,22 @@
 # --- START OF FILE topic_analysis.py ---
-import json
+import os
 import re
-from collections import defaultdict
-from fastapi import APIRouter, HTTPException
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+import numpy as np
 from sklearn.cluster import KMeans
+from sklearn.metrics import davies_bouldin_score, silhouette_score
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sentence_transformers import SentenceTransformer
 
 # Assuming models.py is in the same directory
 from .models import TopicAnalysisResponse 
+from .inference_executor import ExecutorSaturated, get_executor, run_inference
+from .embedding_service import encode_cached
+from .transcript_store import STORE
+from .doubt_dedup import prepare_doubts
 
 # --- Router Setup ---
 router = APIRouter(
@@ -16,52 +24,126 @@ router = APIRouter(
     tags=["Topic Analysis"],
 )
 
-# --- GLOBAL/CACHE for the model ---
-SENTENCE_MODEL = None
-TRANSCRIPT_FILENAME = "Backend/doubt_transcripts.json"
-
-def load_sentence_model():
-    """Loads the sentence transformer model once."""
-    global SENTENCE_MODEL
-    if SENTENCE_MODEL is None:
-        print("Loading SentenceTransformer for Topic Analysis...")
-        # NOTE: Consider using a lighter model for faster loading if necessary
-        SENTENCE_MODEL = SentenceTransformer('all-MiniLM-L6-v2') 
-        print("SentenceTransformer loaded.")
-    return SENTENCE_MODEL
-
-def analyze_transcripts():
-    """Reads transcripts, clusters, and extracts topics. (The core logic from file.py)"""
-    # -----------------------
-    # Load JSON data
-    # -----------------------
-    try:
-        with open(TRANSCRIPT_FILENAME, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            # Assuming the file is a JSON array of strings
-            raw_texts = [d.get("text", "") if isinstance(d, dict) else d for d in data if d]
-            if not raw_texts:
-                return {"total_doubts": 0, "topics": {}, "flagged_topics": ["No valid transcripts found."]}
-    except Exception:
-        return {"total_doubts": 0, "topics": {}, "flagged_topics": [f"Could not read/parse {TRANSCRIPT_FILENAME}."]}
+# --- Configuration ---
+MAX_TOPICS = 5
+TOPIC_ANALYSIS_MODE = os.environ.get("TOPIC_ANALYSIS_MODE", "online")  # online | batch
+TOPIC_REFIT_MIN = int(os.environ.get("TOPIC_REFIT_MIN", 50))
+TOPIC_REFIT_FRACTION = float(os.environ.get("TOPIC_REFIT_FRACTION", 0.1))
+TOPIC_MAX_SCOPES = int(os.environ.get("TOPIC_MAX_SCOPES", 64))
+TOPIC_K_MODE = os.environ.get("TOPIC_K_MODE", "fixed")  # fixed (<= MAX_TOPICS) | auto (silhouette-selected)
+TOPIC_K_MAX = int(os.environ.get("TOPIC_K_MAX", 12))
+TOPIC_SAMPLE_SIZE = int(os.environ.get("TOPIC_SAMPLE_SIZE", 2000))   # rows used to pick k
+QUALITY_SAMPLE_SIZE = int(os.environ.get("TOPIC_QUALITY_SAMPLE_SIZE", 1000))  # rows used for the metrics
+ANALYZER = TfidfVectorizer(stop_words='english').build_analyzer()  # same tokens as the batch TF-IDF
+
+# -----------------------
+# Preprocessing functions
+# -----------------------
+def preprocess(text):
+    text = text.lower()
+    text = re.sub(r'[^a-zA-Z0-9\s]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+def remove_single_char_patterns(text):
+    return re.sub(r'\([A-Za-z]\)', '', text).strip()
+
+def clean_doubts(raw_texts):
+    """
+    Collapses repetition loops, merges near-duplicates and cleans the rest.
+    Returns (cleaned_texts, weights); weights count the raw doubts each text stands for.
+    """
+    unique_texts, counts = prepare_doubts(raw_texts)
+    cleaned_texts, weights = [], []
+    for d, count in zip(unique_texts, counts):
+        text = preprocess(remove_single_char_patterns(d))
+        if len(text.split()) > 1: # Filter out single-word entries
+            cleaned_texts.append(text)
+            weights.append(count)
+    return cleaned_texts, np.asarray(weights, dtype=np.float64)
+
+def target_clusters(n):
+    return min(n // 2 + 1, MAX_TOPICS)
+
+# -----------------------
+# Clustering (fixed or adaptive k)
+# -----------------------
+def sample_rows(n, size, seed=42):
+    if n <= size:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(seed).choice(n, size, replace=False))
+
+def cluster_quality(embeddings, labels):
+    """Silhouette (higher is better) and Davies-Bouldin (lower is better) on a bounded sample."""
+    idx = sample_rows(len(embeddings), QUALITY_SAMPLE_SIZE)
+    x, y = embeddings[idx], labels[idx]
+    k = len(np.unique(y))
+    if k < 2 or k >= len(x):
+        return {"silhouette": None, "davies_bouldin": None}
+    return {
+        "silhouette": round(float(silhouette_score(x, y)), 4),
+        "davies_bouldin": round(float(davies_bouldin_score(x, y)), 4),
+    }
+
+def select_k(sample, weights=None):
+    """Fits k = 2..TOPIC_K_MAX on the sample and keeps the model with the best silhouette."""
+    best, scores = None, {}
+    for k in range(2, min(TOPIC_K_MAX, len(sample) - 1) + 1):
+        kmeans = KMeans(n_clusters=k, random_state=42, n_init='auto').fit(sample, sample_weight=weights)
+        score = cluster_quality(sample, kmeans.labels_)["silhouette"]
+        if score is None:
+            continue
+        scores[str(k)] = score
+        if best is None or score > best[0]:
+            best = (score, kmeans)
+    return (best[1] if best else None), scores
 
+def cluster_embeddings(embeddings, k_mode=None, weights=None):
+    """
+    Returns (labels, centroids, quality). "fixed" keeps the original rule of at most
+    MAX_TOPICS clusters. "auto" picks k by silhouette on a TOPIC_SAMPLE_SIZE sample
+    and then only assigns the remaining rows, so selection cost does not grow with n.
+    `weights` (duplicate counts) are passed to KMeans as sample weights.
+    """
+    k_mode = k_mode or TOPIC_K_MODE
+    n = len(embeddings)
+    kmeans, scores = None, None
+    if k_mode == "auto" and n >= 4:
+        idx = sample_rows(n, TOPIC_SAMPLE_SIZE)
+        kmeans, scores = select_k(embeddings[idx], None if weights is None else weights[idx])
+    if kmeans is None:
+        k_mode = "fixed"
+        kmeans = KMeans(n_clusters=target_clusters(n), random_state=42, n_init='auto').fit(embeddings, sample_weight=weights)
+        labels = kmeans.labels_
+    else:
+        labels = kmeans.predict(embeddings)
+    quality = {"k": int(kmeans.n_clusters), "k_mode": k_mode, "n": n, **cluster_quality(embeddings, labels)}
+    if scores:
+        quality["k_candidates"] = scores
+    return labels, kmeans.cluster_centers_, quality
+
+def analyze_transcripts(k_mode=None, **filters):
+    """
+    Reads transcripts, clusters, and extracts topics. (The core logic from file.py)
+    `filters` (class_id, lecture_id, session_id, since, until) limit the doubts
+    read from the store; with none, every recorded doubt is analyzed.
+    `k_mode` is "fixed" or "auto" (see `cluster_embeddings`).
+    """
     # -----------------------
-    # Preprocessing functions
+    # Stream doubts from the transcript store
     # -----------------------
-    def preprocess(text):
-        text = text.lower()
-        text = re.sub(r'[^a-zA-Z0-9\s]', '', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
-
-    def remove_single_char_patterns(text):
-        return re.sub(r'\([A-Za-z]\)', '', text).strip()
+    try:
+        raw_texts = [t for t in STORE.iter_texts(**filters) if t]
+        if not raw_texts:
+            return {"total_doubts": 0, "topics": {}, "flagged_topics": ["No valid transcripts found."]}
+    except Exception as e:
+        print(f"Topic analysis: could not read the doubt store: {e}")
+        return {"total_doubts": 0, "topics": {}, "flagged_topics": [f"Could not read {STORE.db_path}."]}
 
     # -----------------------
     # Clean and Filter
     # -----------------------
-    cleaned_texts = [preprocess(remove_single_char_patterns(d)) for d in raw_texts]
-    cleaned_texts = [text for text in cleaned_texts if len(text.split()) > 1] # Filter out single-word entries
+    cleaned_texts, weights = clean_doubts(raw_texts)
 
     if len(cleaned_texts) < 2:
         return {"total_doubts": len(raw_texts), "topics": {}, "flagged_topics": ["Not enough distinct, cleaned data for clustering."]}
@@ -70,33 +152,33 @@ def analyze_transcripts():
     # -----------------------
     # Analysis & Clustering
     # -----------------------
-    model = load_sentence_model()
-    embeddings = model.encode(cleaned_texts)
+    embeddings = encode_cached(cleaned_texts)
     
-    n_clusters = min(len(cleaned_texts) // 2 + 1, 5) 
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init='auto')
-    labels = kmeans.fit_predict(embeddings)
+    labels, _, quality = cluster_embeddings(embeddings, k_mode, weights)
 
     cluster_texts = defaultdict(list)
+    cluster_weights = defaultdict(list)
     for idx, label in enumerate(labels):
         cluster_texts[label].append(cleaned_texts[idx])
+        cluster_weights[label].append(weights[idx])
+    cluster_sizes = {label: int(sum(w)) for label, w in cluster_weights.items()}
 
     # -----------------------
     # TF-IDF for Topic Extraction
     # -----------------------
     key_topics = {}
     vectorizer = TfidfVectorizer(stop_words='english')
-    largest_cluster_label = max(cluster_texts, key=lambda k: len(cluster_texts[k]))
+    largest_cluster_label = max(cluster_sizes, key=cluster_sizes.get)
     
     for label, texts in cluster_texts.items():
-        size = len(texts)
+        size = cluster_sizes[label]
         if not texts or size == 0: continue
         
         X = vectorizer.fit_transform(texts)
         if len(vectorizer.get_feature_names_out()) == 0:
             top_keywords = ["general doubt area"]
         else:
-            tfidf_scores = dict(zip(vectorizer.get_feature_names_out(), X.sum(axis=0).A1))
+            tfidf_scores = dict(zip(vectorizer.get_feature_names_out(), X.T @ np.asarray(cluster_weights[label])))
             top_keywords = sorted(tfidf_scores, key=tfidf_scores.get, reverse=True)[:3]
         
         key_topics[f"Cluster {label} ({size} doubts)"] = ", ".join(top_keywords)
@@ -104,23 +186,221 @@ def analyze_transcripts():
     # -----------------------
     # Final Output
     # -----------------------
-    largest_topic_key = f"Cluster {largest_cluster_label} ({len(cluster_texts[largest_cluster_label])} doubts)"
+    largest_topic_key = f"Cluster {largest_cluster_label} ({cluster_sizes[largest_cluster_label]} doubts)"
     
     output = {
         "total_doubts": len(raw_texts),
         "topics": key_topics,
-        "flagged_topics": [key_topics.get(largest_topic_key, "N/A")]
+        "flagged_topics": [key_topics.get(largest_topic_key, "N/A")],
+        "mode": "batch",
+        "quality": quality,
     }
     return output
 
+
+class OnlineTopicModel:
+    """
+    Topic clusters for one scope (all doubts, or one lecture), maintained incrementally.
+
+    `sync` tails the transcript store from the last ingested id, so rows written by
+    any uvicorn worker are picked up. New doubts are assigned to the nearest
+    centroid, which then moves by a 1/count step (streaming k-means), and their
+    tokens are added to per-cluster term counts. Keywords are the top
+    term-count x IDF terms, so reading topics is a dictionary walk. A full re-fit
+    (KMeans over all doubts, then recounting) runs when the target number of
+    clusters grows or once `refit_fraction` of the data arrived since the last
+    one, so its cost amortizes to O(1) per doubt.
+    """
+
+    def __init__(self, filters, k_mode=None, batch_size=1024):
+        self.filters = filters
+        self.k_mode = k_mode or TOPIC_K_MODE
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.cursor = 0        # last store id ingested
+        self.total = 0         # raw doubts seen
+        self.n = 0             # cleaned doubts clustered (duplicates included)
+        self.distinct = 0      # distinct texts among them (approximate between fits)
+        self.since_fit = 0
+        self.fits = 0
+        self.centroids = None
+        self.sizes = None
+        self.terms = []        # per-cluster Counter of tokens
+        self.df = Counter()    # document frequency over all clustered doubts
+        self.quality = None    # metrics of the last full fit
+
+    def _due(self):
+        if self.distinct < 2:
+            return False
+        if self.centroids is None:
+            return True
+        if self.k_mode == "fixed" and len(self.centroids) < target_clusters(self.distinct):
+            return True
+        return self.since_fit >= max(TOPIC_REFIT_MIN, TOPIC_REFIT_FRACTION * self.n)
+
+    def _fit(self):
+        """Full re-fit over every doubt in scope up to the cursor."""
+        texts, weights = clean_doubts(STORE.iter_texts(until_id=self.cursor, **self.filters))
+        embeddings = encode_cached(texts)
+        labels, centroids, self.quality = cluster_embeddings(embeddings, self.k_mode, weights)
+        self.centroids = centroids.astype(np.float32)
+        self.sizes = np.bincount(labels, weights=weights, minlength=len(self.centroids)).astype(np.int64)
+        self.terms = [Counter() for _ in self.centroids]
+        self.df = Counter()
+        self._count_terms(texts, weights, labels)
+        self.n, self.distinct, self.since_fit = int(weights.sum()), len(texts), 0
+        self.fits += 1
+
+    def _count_terms(self, texts, weights, labels):
+        for text, w, label in zip(texts, weights, labels):
+            counts = {token: int(w) for token in set(ANALYZER(text))}
+            self.terms[label].update(counts)
+            self.df.update(counts)
+
+    def _assign(self, texts, weights):
+        embeddings = encode_cached(texts)
+        labels = []
+        for x, w in zip(embeddings, weights):
+            label = int(((self.centroids - x) ** 2).sum(axis=1).argmin())
+            self.sizes[label] += int(w)
+            self.centroids[label] += w * (x - self.centroids[label]) / self.sizes[label]
+            labels.append(label)
+        self._count_terms(texts, weights, labels)
+
+    def sync(self):
+        """Ingests doubts appended since the last call (cheap when nothing is new)."""
+        with self.lock:
+            new_texts = []
+            for row in STORE.iter_doubts(batch_size=self.batch_size, after_id=self.cursor, **self.filters):
+                self.cursor = row["id"]
+                self.total += 1
+                new_texts.append(row["text"])
+            cleaned, weights = clean_doubts(new_texts)
+            self.n += int(weights.sum())
+            self.distinct += len(cleaned)
+            self.since_fit += int(weights.sum())
+            if self._due():
+                self._fit()
+            elif cleaned and self.centroids is not None:
+                self._assign(cleaned, weights)
+
+    def keywords(self, label, top_n=3):
+        n = max(self.n, 1)
+        scores = {t: c * (np.log((1 + n) / (1 + self.df[t])) + 1) for t, c in self.terms[label].items()}
+        return sorted(scores, key=scores.get, reverse=True)[:top_n] or ["general doubt area"]
+
+    def result(self):
+        with self.lock:
+            if self.total == 0:
+                return {"total_doubts": 0, "topics": {}, "flagged_topics": ["No valid transcripts found."], "mode": "online"}
+            if self.centroids is None:
+                return {"total_doubts": self.total, "topics": {}, "flagged_topics": ["Not enough distinct, cleaned data for clustering."], "mode": "online"}
+            key_topics = {}
+            for label, size in enumerate(self.sizes):
+                if size:
+                    key_topics[f"Cluster {label} ({size} doubts)"] = ", ".join(self.keywords(label))
+            largest = int(self.sizes.argmax())
+            return {
+                "total_doubts": self.total,
+                "topics": key_topics,
+                "flagged_topics": [key_topics.get(f"Cluster {largest} ({self.sizes[largest]} doubts)", "N/A")],
+                "mode": "online",
+                "quality": {**self.quality, "n": self.distinct, "doubts_since_fit": self.since_fit},
+            }
+
+
+TOPIC_MODELS = OrderedDict()  # scope key -> OnlineTopicModel (LRU, at most TOPIC_MAX_SCOPES)
+TOPIC_MODELS_LOCK = threading.Lock()
+
+
+def get_topic_model(lecture_id=None, k_mode=None):
+    """Maintained topic state for one lecture, or for all doubts when `lecture_id` is None."""
+    key = (lecture_id, k_mode or TOPIC_K_MODE)
+    with TOPIC_MODELS_LOCK:
+        model = TOPIC_MODELS.get(key)
+        if model is None:
+            model = OnlineTopicModel({"lecture_id": lecture_id} if lecture_id is not None else {}, k_mode=key[1])
+            TOPIC_MODELS[key] = model
+            while len(TOPIC_MODELS) > TOPIC_MAX_SCOPES:
+                TOPIC_MODELS.popitem(last=False)
+        TOPIC_MODELS.move_to_end(key)
+        return model
+
+
+def observe_transcript(lecture_id=None):
+    """Called after /asr/transcribe stores a doubt: folds it into the maintained topic state."""
+    if TOPIC_ANALYSIS_MODE != "online":
+        return
+    try:
+        get_topic_model(None).sync()
+        if lecture_id is not None:
+            get_topic_model(lecture_id).sync()
+    except Exception as e:
+        print(f"Online topic update failed: {e}")
+
+
+TOPIC_UPDATES_QUEUED = set()  # lecture ids (None = all doubts) with a refit queued but not started
+TOPIC_UPDATE_COUNTS = {"run": 0, "coalesced": 0, "dropped": 0}
+
+
+def _run_topic_update(lecture_id):
+    TOPIC_UPDATES_QUEUED.discard(lecture_id)  # doubts stored from now on need another update
+    observe_transcript(lecture_id)
+    TOPIC_UPDATE_COUNTS["run"] += 1
+
+
+async def schedule_topic_update(lecture_id=None):
+    """
+    Runs `observe_transcript` on the bounded "analysis" lane. An update already
+    queued for the same lecture will read the new doubt too, so this one is
+    coalesced into it; when the lane is saturated it is dropped, and the next
+    update or /topics request folds the doubt in (sync reads from a cursor).
+    """
+    if TOPIC_ANALYSIS_MODE != "online":
+        return
+    if lecture_id in TOPIC_UPDATES_QUEUED:
+        TOPIC_UPDATE_COUNTS["coalesced"] += 1
+        return
+    TOPIC_UPDATES_QUEUED.add(lecture_id)
+    try:
+        await get_executor("analysis").run(_run_topic_update, lecture_id)
+    except ExecutorSaturated:
+        TOPIC_UPDATES_QUEUED.discard(lecture_id)
+        TOPIC_UPDATE_COUNTS["dropped"] += 1
+
+
+def online_topics(lecture_id=None, k_mode=None):
+    model = get_topic_model(lecture_id, k_mode)
+    model.sync()
+    return model.result()
+
 # --- New FastAPI Route ---
 @router.post("/topics", response_model=TopicAnalysisResponse)
-def get_topic_analysis():
+async def get_topic_analysis(
+    class_id: Optional[str] = Query(None),
+    lecture_id: Optional[str] = Query(None),
+    session_id: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None, description="Only doubts recorded at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only doubts recorded before this time"),
+    mode: Optional[str] = Query(None, description="'online' reads maintained clusters, 'batch' re-clusters everything"),
+    k_mode: Optional[str] = Query(None, description="'fixed' (at most 5 topics) or 'auto' (k chosen by silhouette on a sample)"),
+):
     """
     Triggers the analysis of recorded student doubt transcripts, 
     clusters them, and returns the key focus areas.
+    Optional filters restrict it to one class, lecture, session or time window.
+    Online mode serves all doubts or a single lecture; other filters use batch mode.
     """
-    result = analyze_transcripts()
+    mode = mode or TOPIC_ANALYSIS_MODE
+    if mode not in ("online", "batch"):
+        raise HTTPException(status_code=400, detail="mode must be 'online' or 'batch'.")
+    if k_mode not in (None, "fixed", "auto"):
+        raise HTTPException(status_code=400, detail="k_mode must be 'fixed' or 'auto'.")
+    if mode == "online" and class_id is None and session_id is None and since is None and until is None:
+        result = await run_inference("analysis", online_topics, lecture_id, k_mode)
+    else:
+        filters = dict(class_id=class_id, lecture_id=lecture_id, session_id=session_id, since=since, until=until)
+        result = await run_inference("analysis", analyze_transcripts, k_mode, **filters)
     
     # Check if the error came from file/data issues
     if result.get("total_doubts") == 0 and "not enough" not in result.get("flagged_topics", [""])[0].lower():
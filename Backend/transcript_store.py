@@ -0,0 +1,174 @@
+# --- START OF FILE transcript_store.py ---
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+TRANSCRIPT_DB_PATH = "Backend/doubt_transcripts.db"
+LEGACY_JSON_PATH = "Backend/doubt_transcripts.json"  # imported once, then no longer written
+SCOPE_COLUMNS = ("class_id", "lecture_id", "session_id")
+
+
+def to_epoch(value):
+    """datetime / ISO-8601 string / epoch seconds -> epoch seconds (None passes through)."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+class TranscriptStore:
+    """
+    Append-only store for student doubt transcripts (SQLite in WAL mode).
+
+    Each append is a single-row INSERT, so cost does not grow with history,
+    and SQLite's locking keeps concurrent writers from several uvicorn workers
+    from losing or corrupting entries. WAL lets readers stream while a write is
+    in progress. Connections are per thread.
+
+    Doubts carry optional class/lecture/session ids and an epoch `created_at`;
+    composite indexes on (scope id, created_at) let the analysis endpoints read
+    one lecture or time window without scanning the whole history.
+    """
+
+    def __init__(self, db_path=TRANSCRIPT_DB_PATH, legacy_json=LEGACY_JSON_PATH):
+        self.db_path = db_path
+        self.legacy_json = legacy_json
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    self._init_schema(conn)
+                    self._ready = True
+        return conn
+
+    def _init_schema(self, conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS doubts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                text TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                class_id TEXT,
+                lecture_id TEXT,
+                session_id TEXT,
+                created_at REAL NOT NULL
+            )""")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        for column in SCOPE_COLUMNS:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_doubts_{column} ON doubts ({column}, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_doubts_created_at ON doubts (created_at)")
+        if self.legacy_json:
+            self._migrate_json(conn, self.legacy_json)
+
+    @staticmethod
+    def _parse_ts(timestamp):
+        try:
+            return to_epoch(timestamp)
+        except (TypeError, ValueError):
+            return time.time()
+
+    def _migrate_json(self, conn, path):
+        """One-time import of the old JSON array (guarded by a meta flag, safe across workers)."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            done = conn.execute("SELECT value FROM meta WHERE key = 'migrated_json'").fetchone()
+            if done is None and os.path.exists(path) and os.path.getsize(path) > 0:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                rows = []
+                for d in data if isinstance(data, list) else []:
+                    if isinstance(d, dict) and d.get("text"):
+                        ts = d.get("timestamp") or datetime.now().isoformat()
+                        rows.append((d["text"], ts, self._parse_ts(ts)))
+                    elif isinstance(d, str) and d:
+                        rows.append((d, datetime.now().isoformat(), time.time()))
+                conn.executemany("INSERT INTO doubts (text, timestamp, created_at) VALUES (?, ?, ?)", rows)
+                print(f"✅ Transcript store: migrated {len(rows)} doubts from {path}")
+            if done is None:
+                conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_json', ?)", (datetime.now().isoformat(),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def append(self, text, timestamp=None, class_id=None, lecture_id=None, session_id=None):
+        """O(1) append of one transcript, tagged with its scope; returns its id."""
+        when = timestamp or datetime.now()
+        if isinstance(when, datetime):
+            when = when.isoformat()
+        cur = self._connect().execute(
+            "INSERT INTO doubts (text, timestamp, created_at, class_id, lecture_id, session_id) VALUES (?, ?, ?, ?, ?, ?)",
+            (text, when, self._parse_ts(when), class_id, lecture_id, session_id),
+        )
+        return cur.lastrowid
+
+    @staticmethod
+    def _where(class_id=None, lecture_id=None, session_id=None, since=None, until=None, after_id=None, until_id=None):
+        clauses, params = [], []
+        if after_id is not None:
+            clauses.append("id > ?")
+            params.append(after_id)
+        if until_id is not None:
+            clauses.append("id <= ?")
+            params.append(until_id)
+        for column, value in zip(SCOPE_COLUMNS, (class_id, lecture_id, session_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(to_epoch(since))
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(to_epoch(until))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def iter_doubts(self, batch_size=1000, **filters):
+        """
+        Streams doubts as dicts in insertion order without loading them all at once.
+        Filters: class_id, lecture_id, session_id, since, until (datetime, ISO string or epoch),
+        after_id / until_id (id range, for consumers that tail the log).
+        """
+        where, params = self._where(**filters)
+        cur = self._connect().execute(
+            "SELECT id, text, timestamp, created_at, class_id, lecture_id, session_id FROM doubts"
+            + where + " ORDER BY id", params)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
+
+    def iter_texts(self, batch_size=1000, **filters):
+        where, params = self._where(**filters)
+        cur = self._connect().execute("SELECT text FROM doubts" + where + " ORDER BY id", params)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row[0]
+
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        return self._connect().execute("SELECT COUNT(*) FROM doubts" + where, params).fetchone()[0]
+
+
+STORE = TranscriptStore()
+# --- END OF FILE transcript_store.py ---
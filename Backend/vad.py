@@ -0,0 +1,129 @@
+# --- START OF FILE vad.py ---
+import numpy as np
+
+FRAME_MS = 30
+MARGIN_DB = 12.0        # speech must be this far above the clip's noise floor...
+MIN_SPEECH_DB = -45.0   # ...and at least this loud (dBFS)
+LOUD_DB = -30.0         # frames this loud count as speech whatever the floor (clips that are all speech)
+MIN_SPEECH_MS = 150     # shorter bursts (clicks, taps) are ignored
+MIN_SILENCE_MS = 400    # shorter pauses do not split a segment
+PAD_MS = 200            # kept around each segment so word edges are not clipped
+
+
+class VadResult:
+    def __init__(self, segments, total_samples, sample_rate):
+        self.segments = segments  # [(start, end)] in samples
+        self.total_samples = total_samples
+        self.sample_rate = sample_rate
+
+    @property
+    def speech_samples(self):
+        """Samples inside the segments, which is exactly what `chunks` sends to Whisper."""
+        return sum(end - start for start, end in self.segments)
+
+    @property
+    def has_speech(self):
+        return bool(self.segments)
+
+    @property
+    def skipped_fraction(self):
+        if not self.total_samples:
+            return 0.0
+        return 1.0 - self.speech_samples / self.total_samples
+
+    def chunks(self, samples, max_seconds=25.0):
+        """Speech-only clips of at most `max_seconds` (Whisper's window is 30 s).
+        Consecutive segments are joined without the pauses between them; a clip
+        is closed at a segment boundary where possible."""
+        limit = int(max_seconds * self.sample_rate)
+        out, group, length = [], [], 0
+        for s, e in self.segments:
+            if group and length + (e - s) > limit:
+                out.append(np.concatenate(group))
+                group, length = [], 0
+            while e - s > limit:  # one very long segment
+                out.append(samples[s:s + limit])
+                s += limit
+            group.append(samples[s:e])
+            length += e - s
+        if group:
+            out.append(np.concatenate(group))
+        return out
+
+    def summary(self):
+        sr = float(self.sample_rate)
+        return {
+            "audio_seconds": round(self.total_samples / sr, 2),
+            "speech_seconds": round(float(self.speech_samples) / sr, 2),
+            "skipped_fraction": round(float(self.skipped_fraction), 3),
+            "segments": len(self.segments),
+        }
+
+
+def _runs(mask):
+    """(start, end) index pairs of the True runs in a boolean array."""
+    padded = np.concatenate([[False], mask, [False]])
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges.reshape(-1, 2)
+
+
+def detect_speech(samples, sample_rate=16000, frame_ms=FRAME_MS, margin_db=MARGIN_DB,
+                  min_speech_db=MIN_SPEECH_DB, loud_db=LOUD_DB, min_speech_ms=MIN_SPEECH_MS,
+                  min_silence_ms=MIN_SILENCE_MS, pad_ms=PAD_MS):
+    """
+    Energy-based voice activity detection. Frame RMS (dBFS) is compared with an
+    adaptive threshold (10th-percentile noise floor + `margin_db`, clamped to
+    [`min_speech_db`, `loud_db`]); short pauses are bridged, short bursts dropped and each
+    segment padded. Everything is vectorized over frames.
+    """
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = samples.size // frame
+    if n_frames == 0:
+        return VadResult([], samples.size, sample_rate)
+    frames = samples[:n_frames * frame].reshape(n_frames, frame).astype(np.float32)
+    db = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    threshold = min(max(np.percentile(db, 10) + margin_db, min_speech_db), loud_db)
+    voiced = db > threshold
+
+    # Bridge short pauses, then drop bursts that are still too short.
+    min_gap = int(np.ceil(min_silence_ms / frame_ms))
+    for start, end in _runs(~voiced):
+        if 0 < start and end < n_frames and end - start < min_gap:
+            voiced[start:end] = True
+    min_len = int(np.ceil(min_speech_ms / frame_ms))
+    pad = int(pad_ms * sample_rate / 1000)
+    segments = []
+    for start, end in _runs(voiced):
+        if end - start < min_len:
+            continue
+        s, e = max(0, int(start) * frame - pad), min(samples.size, int(end) * frame + pad)
+        if segments and s <= segments[-1][1]:
+            segments[-1] = (segments[-1][0], e)
+        else:
+            segments.append((s, e))
+    return VadResult(segments, samples.size, sample_rate)
+
+
+class VadStats:
+    """Running totals of how much uploaded audio never reached Whisper."""
+
+    def __init__(self):
+        self.clips = 0
+        self.rejected = 0
+        self.audio_s = 0.0
+        self.speech_s = 0.0
+
+    def record(self, result):
+        self.clips += 1
+        self.rejected += 0 if result.has_speech else 1
+        self.audio_s += result.total_samples / result.sample_rate
+        self.speech_s += result.speech_samples / result.sample_rate
+
+    def stats(self):
+        return {
+            "clips": self.clips,
+            "rejected_no_speech": self.rejected,
+            "audio_seconds": round(self.audio_s, 1),
+            "skipped_fraction": round(1.0 - self.speech_s / self.audio_s, 3) if self.audio_s else 0.0,
+        }
+# --- END OF FILE vad.py ---
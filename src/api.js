@@ -12,11 +12,28 @@ export async function predictFile(modelName, fileBlob) {
   return res.data;
 }
 
+// --- NEW: Streaming Facial Engagement over a WebSocket ---
+// Send JPEG blobs with `socket.send(blob)`; the server keeps only the newest
+// frame when we send faster than it can infer, and pushes back one prediction
+// per processed frame.
+export function openPredictionStream(modelName, sessionId, onPrediction) {
+  const wsBase = API.replace(/^http/, "ws");
+  const query = sessionId ? `?session_id=${encodeURIComponent(sessionId)}` : "";
+  const socket = new WebSocket(`${wsBase}/predict/${modelName}/stream${query}`);
+  socket.binaryType = "arraybuffer";
+  socket.onmessage = (event) => onPrediction(JSON.parse(event.data));
+  return socket;
+}
+
 // --- NEW: Audio Transcription/Translation (for SpeechAnalysis.jsx) ---
-export async function transcribeAudio(audioBlob) {
+// `scope` ({class_id, lecture_id, session_id}, all optional) tags the stored doubt.
+export async function transcribeAudio(audioBlob, scope = {}) {
   const form = new FormData();
   // Key 'file' must match the parameter in asr_router.py
   form.append("file", audioBlob, "recording.wav"); 
+  Object.entries(scope).forEach(([key, value]) => {
+    if (value != null) form.append(key, value);
+  });
   const res = await axios.post(`${API}/asr/transcribe`, form, {
     headers: { "Content-Type": "multipart/form-data" },
   });
@@ -24,10 +41,26 @@ export async function transcribeAudio(audioBlob) {
   return res.data;
 }
 
+// --- NEW: Streaming transcription over a WebSocket ---
+// Send 16 kHz mono PCM16 chunks (ArrayBuffer) with `socket.send(chunk)` and
+// `socket.send("end")` when the student stops. `onUpdate` receives
+// {type: "partial" | "final" | "error", transcript, audio_seconds, doubt_id}.
+export function openTranscriptionStream(scope = {}, onUpdate) {
+  const wsBase = API.replace(/^http/, "ws");
+  const params = new URLSearchParams(
+    Object.entries(scope).filter(([, value]) => value != null)
+  ).toString();
+  const socket = new WebSocket(`${wsBase}/asr/stream${params ? `?${params}` : ""}`);
+  socket.binaryType = "arraybuffer";
+  socket.onmessage = (event) => onUpdate(JSON.parse(event.data));
+  return socket;
+}
+
 // --- NEW: Trigger Topic Analysis (for TopicCard.jsx) ---
-export async function triggerTopicAnalysis() {
+// `filters` ({class_id, lecture_id, session_id, since, until}) limit which doubts are analyzed.
+export async function triggerTopicAnalysis(filters = {}) {
   // We use POST even if no body is sent because it triggers a server-side process
-  const res = await axios.post(`${API}/analyze/topics`);
+  const res = await axios.post(`${API}/analyze/topics`, null, { params: filters });
   // Returns {total_doubts: 5, topics: {...}, flagged_topics: [...]}
   return res.data;
 }
@@ -43,15 +76,17 @@ export async function getHealthStatus() {
 /**
  * Sends a lecture transcript file to the backend to map student doubts to time segments.
  * @param {File} transcriptFile - The file containing the timestamped lecture transcript.
+ * @param {object} [filters] - Optional {class_id, lecture_id, session_id, since, until} doubt filters.
  * @returns {Promise<object>} The flagged time segments.
  */
-export async function analyzeLecture(transcriptFile) {
+export async function analyzeLecture(transcriptFile, filters = {}) {
   const form = new FormData();
   // Key 'lecture_transcript_file' must match the parameter in lecture_analysis_router.py
   form.append("lecture_transcript_file", transcriptFile, "lecture.txt"); 
   
   const res = await axios.post(`${API}/teacher/analyze_lecture`, form, {
     headers: { "Content-Type": "multipart/form-data" },
+    params: filters,
   });
   return res.data;
 }